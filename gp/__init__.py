@@ -1,5 +1,3 @@
-import warnings
-
 """
 GenePattern Python Client
 
@@ -11,5 +9,34 @@ __copyright__ = 'Copyright 2014-2024, Regents of the University of California &
 __version__ = '24.01'
 __status__ = 'Production'
 
-# Import core functionality
-from .core import GPException, GPFile, GPJob, GPJobSpec, GPResource, GPServer, GPTask, GPTaskParam, GPJSONEncoder
+import sys
+import importlib
+
+# Core functionality, imported from gp.core when first accessed
+_LAZY = {'GPException', 'GPFile', 'GPJob', 'GPJobSpec', 'GPResource', 'GPServer', 'GPTask', 'GPTaskParam',
+         'GPJSONEncoder'}
+
+# Submodules, which may be used as attributes of gp without importing them first
+_SUBMODULES = {'data', 'modules'}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from . import core
+        value = getattr(core, name)
+        globals()[name] = value  # Later lookups find the name without calling __getattr__
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)  # Importing also sets the attribute on gp
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY | _SUBMODULES)
+
+
+# Module __getattr__ requires Python 3.7+, import eagerly on older versions
+if sys.version_info < (3, 7):
+    from .core import GPException, GPFile, GPJob, GPJobSpec, GPResource, GPServer, GPTask, GPTaskParam, GPJSONEncoder
@@ -0,0 +1,17 @@
+# Static declarations for gp/__init__.py, whose classes are imported lazily at runtime
+
+from .core import GPException as GPException
+from .core import GPFile as GPFile
+from .core import GPJob as GPJob
+from .core import GPJobSpec as GPJobSpec
+from .core import GPResource as GPResource
+from .core import GPServer as GPServer
+from .core import GPTask as GPTask
+from .core import GPTaskParam as GPTaskParam
+from .core import GPJSONEncoder as GPJSONEncoder
+
+__authors__: list
+__copyright__: str
+__version__: str
+__status__: str
+__all__: list
@@ -1,16 +1,58 @@
-import sys
-import urllib
 import base64
+import io
+import os
+import sys
+import gzip
+import enum
 import json
 import time
+import uuid
+import random
+import select
+import asyncio
+import threading
+import collections
+import http.client
+import concurrent.futures
 from contextlib import closing
 import urllib.request
 import urllib.parse
 import urllib.error
 
+# Parse and serialize JSON with orjson if it is installed, which is faster and works on bytes directly
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
 
 GP_JOB_TAG = 'GenePattern Python Client'
 
+# String values that GenePattern treats as True in task and parameter metadata
+_TRUTHY = frozenset(('on', 'yes', 'true'))
+
+# Bounds and growth rate, in seconds, of the randomized interval between polls of a running job
+_POLL_MIN = 0.1
+_POLL_MAX = 30
+_POLL_RATE = 1.5
+
+# Size of the blocks in which request bodies are read from file objects and sent
+_BLOCK_SIZE = 1 << 16
+
+# Seconds added to the minimum wait between polls for each job still being waited on, up to _POLL_MAX
+_POLL_PER_JOB = 0.02
+
+# HTTP methods that GPServer._request() may safely resend after a connection failure
+_IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+
+# HTTP statuses that GPServer._request() follows to the Location header
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# The status, headers and fully read body of a REST call made by GPServer._request()
+_Response = collections.namedtuple('_Response', ['status', 'headers', 'body'])
+
 
 class GPServer(object):
     """
@@ -26,35 +68,181 @@ class GPServer(object):
         self.password = password
         self.token = None
         self.last_job = None
+        self._pool = _ConnectionPool()
+        self._auth_credentials = None
+        self._auth_header = None
+        self._etag_cache = {}
+        self._task_list = None
+        self._task_bodies = {}
+        # REST endpoints and the percent-encoded username, built once per server
+        self._safe_username = urllib.parse.quote(username)
+        self._jobs_url = f'{url}/rest/v1/jobs'
+        self._tasks_url = f'{url}/rest/v1/tasks'
 
     def __str__(self):
         return self.url + ' ' + self.username
 
+    def __getstate__(self):
+        # Open connections can't be pickled or copied, the copy starts with an empty pool
+        state = self.__dict__.copy()
+        del state['_pool']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool = _ConnectionPool()
+
     def authorization_header(self):
         """
         Returns a string containing the authorization header used to authenticate
         with GenePattern. This string is included in the header of subsequent
         requests sent to GenePattern.
+
+        Once login() has obtained an OAuth2 token, the token is sent as a Bearer
+        header, which the server can validate more cheaply than a password.
         """
-        return 'Basic %s' % base64.b64encode(bytes(self.username + ':' + self.password, 'ascii')).decode('ascii')
-    
+        # Build the header once, only redoing it if the username, password or token is changed
+        credentials = (self.username, self.password, self.token)
+        if credentials != self._auth_credentials:
+            if self.token is not None:
+                self._auth_header = 'Bearer %s' % self.token
+            else:
+                self._auth_header = 'Basic %s' % base64.b64encode(f'{self.username}:{self.password}'.encode('ascii')).decode('ascii')
+            self._auth_credentials = credentials
+        return self._auth_header
+
+    def _request(self, url, data=None, method=None, headers=None, auth=True, redirects=5):
+        """
+        Make a REST call and return its status, headers and body. Connections to the server
+        are kept alive and reused by subsequent calls, rather than reconnecting for each one.
+
+        Args:
+            :param url: The URL to request
+            :param data: Optional bytes or binary file object to send as the request body
+            :param method: The HTTP method, GET or POST (if data is given) by default
+            :param headers: Optional dict of additional request headers
+            :param auth: Whether to send the authorization header
+            :param redirects: The maximum number of redirects to follow
+
+        Returns:
+            :return: A _Response namedtuple of the status code, headers and body bytes.
+                     Raises urllib.error.HTTPError for error statuses, like urlopen().
+        """
+        data_start = data.tell() if hasattr(data, 'seek') else None
+        try:
+            return self._send(url, data, method, headers, auth, redirects)
+        except urllib.error.HTTPError as e:
+            # A rejected token has most likely expired, log in again for a new one and retry once
+            if e.code != 401 or not auth or self.token is None:
+                raise e
+            self.login()
+            if data_start is not None:
+                data.seek(data_start)
+            return self._send(url, data, method, headers, auth, redirects)
+
+    def _send(self, url, data, method, headers, auth, redirects):
+        """
+        Sends a single REST call for _request(), following any redirects
+        """
+        if method is None:
+            method = 'GET' if data is None else 'POST'
+
+        # Assemble the headers, defaulting the content type for request bodies the same way as urllib
+        # and accepting compressed responses, which are decompressed below
+        request_headers = {'User-Agent': 'GenePatternRest', 'Accept-Encoding': 'gzip'}
+        auth_header = self.authorization_header() if auth else None
+        if auth_header is not None:
+            request_headers['Authorization'] = auth_header
+        if data is not None:
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if headers is not None:
+            request_headers.update(headers)
+
+        # Defer to urllib for anything other than a direct HTTP(S) connection, such as proxied requests
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or _is_proxied(parts):
+            request = urllib.request.Request(url, data=data, headers=request_headers, method=method)
+            with closing(urllib.request.urlopen(request)) as response:
+                return _Response(response.getcode(), response.headers, _decode_body(response.headers, response.read()))
+
+        # Send the request over a pooled connection, retrying if a reused connection was closed by the server
+        path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        data_start = data.tell() if hasattr(data, 'seek') else None
+        while True:
+            connection, reused = self._pool.acquire(parts.scheme, parts.netloc)
+            sent = False
+            try:
+                connection.request(method, path, body=data, headers=request_headers)
+                sent = True
+                response = connection.getresponse()
+                body = _decode_body(response.headers, response.read())
+            except (ConnectionError, http.client.HTTPException) as e:
+                connection.close()
+                # A request that isn't idempotent, such as a job submission, may already have been
+                # acted on once fully sent, so only resend it if it never reached the server
+                if reused and (not sent or method in _IDEMPOTENT_METHODS):
+                    # Rewind file bodies which may have been partially sent
+                    if data_start is not None:
+                        data.seek(data_start)
+                    continue
+                raise urllib.error.URLError(e)
+            except OSError as e:
+                connection.close()
+                raise urllib.error.URLError(e)
+            break
+
+        # Return the connection to the pool unless the server asked to close it
+        if response.will_close:
+            connection.close()
+        else:
+            self._pool.release(parts.scheme, parts.netloc, connection)
+
+        # Follow redirects, only sending credentials back to the same host
+        location = response.getheader('Location')
+        if response.status in _REDIRECT_STATUSES and location and redirects > 0:
+            location = urllib.parse.urljoin(url, location)
+            same_host = urllib.parse.urlsplit(location).netloc == parts.netloc
+            if response.status not in (307, 308):
+                data, method = None, 'GET'
+            return self._send(location, data, method, headers, auth and same_host, redirects - 1)
+
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+        return _Response(response.status, response.headers, body)
+
+    def _request_cached(self, url, auth=True):
+        """
+        GET a URL, sending the ETag of the last response so that the server can reply
+        304 Not Modified rather than resending unchanged content. Returns the body bytes.
+        """
+        cached = self._etag_cache.get(url)
+        try:
+            response = self._request(url, headers={'If-None-Match': cached[0]} if cached else None, auth=auth)
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not cached:  # urllib reports 304 as an error
+                raise e
+            return cached[1]
+        if response.status == 304 and cached:
+            return cached[1]
+        etag = response.headers.get('ETag')
+        if etag:
+            self._etag_cache[url] = (etag, response.body)
+        return response.body
+
     def system_message(self):
         url = f"{self.url}/rest/v1/config/system-message"
-        request = urllib.request.Request(url)
-        response = urllib.request.urlopen(request)
-        return response.read().decode('utf-8')
+        return self._request_cached(url, auth=False).decode('utf-8')
     
     def login(self):
         """Log in to the OAuth2 endpoint"""
-        safe_username = urllib.parse.quote(self.username)
+        safe_username = self._safe_username
         safe_password = urllib.parse.quote(self.password)
         url = f"{self.url}/rest/v1/oauth2/token?grant_type=password&username={safe_username}&password={safe_password}&client_id=GenePatternNotebook-{safe_username}"
 
-        request = urllib.request.Request(url)
-        response = urllib.request.urlopen(request, b'')
-        if response.getcode() != 200:
-            raise urllib.error.HTTPError(url, response.getcode(), 'Invalid username or password', response.getheaders(), None)
-        self.token = json.loads(response.read())['access_token']
+        response = self._request(url, b'', auth=False)
+        if response.status != 200:
+            raise urllib.error.HTTPError(url, response.status, 'Invalid username or password', response.headers, None)
+        self.token = _json_loads(response.body)['access_token']
         return self.token
 
     def upload_file(self, file_name, file_path):
@@ -72,24 +260,20 @@ class GPServer(object):
             :return: A GPFile object that wraps the URI of the uploaded file, or None if the upload fails.
         """
 
-        request = urllib.request.Request(self.url + '/rest/v1/data/upload/job_input?name=' + urllib.parse.quote(file_name))
-        if self.authorization_header() is not None:
-            request.add_header('Authorization', self.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
+        # Stream the file from disk rather than reading it into memory
         with open(file_path, 'rb') as f:
-            data = f.read()
-
-        try:
-            response = urllib.request.urlopen(request, data)
-        except IOError:
-            print("authentication failed")
-            return None
-
-        if response.getcode() != 201:
-            print("file upload failed, status code = %i" % response.getcode())
+            try:
+                response = self._request(self.url + '/rest/v1/data/upload/job_input?name=' + urllib.parse.quote(file_name),
+                                         f, headers={'Content-Length': str(os.fstat(f.fileno()).st_size)})
+            except IOError:
+                print("authentication failed")
+                return None
+
+        if response.status != 201:
+            print("file upload failed, status code = %i" % response.status)
             return None
 
-        return GPFile(self, response.info().get('Location'))
+        return GPFile(self, response.headers.get('Location'))
 
     def run_job(self, job_spec, wait_until_done=True):
         """
@@ -112,33 +296,52 @@ class GPServer(object):
 
         # names should be a list of names,
         # values should be a list of **lists** of values
-        json_string = json.dumps({'lsid': job_spec.lsid, 'params': job_spec.params, 'tags': [GP_JOB_TAG]}, cls=GPJSONEncoder)
-        if sys.version_info.major == 3:  # Handle conversion to bytes for Python 3
-            json_string = bytes(json_string, 'utf-8')
-        request = urllib.request.Request(self.url + '/rest/v1/jobs')
-        if self.authorization_header() is not None:
-            request.add_header('Authorization', self.authorization_header())
-        request.add_header('Content-Type', 'application/json')
-        request.add_header('User-Agent', 'GenePatternRest')
+        json_string = _json_dumps({'lsid': job_spec.lsid, 'params': job_spec.params, 'tags': [GP_JOB_TAG]})
         try:
-            response = urllib.request.urlopen(request, json_string)
+            response = self._request(self._jobs_url, json_string, headers={'Content-Type': 'application/json'})
         except urllib.error.HTTPError as e:
             if e.code == 403:
                 print("job POST failed, your account is either over the data limit or you have too many jobs running")
             else:
                 print(f" job POST failed, status code = {e.code}, {e.reason}")
             return None
-        if response.getcode() != 201:
-            print(" job POST failed, status code = %i" % response.getcode())
+        if response.status != 201:
+            print(" job POST failed, status code = %i" % response.status)
             return None
-        data = json.loads(response.read().decode('utf-8'))
+        data = _json_loads(response.body)
         job = GPJob(self, data['jobId'])
-        job.get_info()
+        if 'taskName' in data:  # Use the job info if the server included it in the response
+            job.info = data
+            job.load_info()
+        elif not wait_until_done:  # Otherwise waiting fetches the info, so only fetch it here if not waiting
+            job.get_info()
         self.last_job = job  # Set the last job
         if wait_until_done:
             job.wait_until_done()
         return job
 
+    def run_jobs(self, job_specs, wait_until_done=True, max_workers=8):
+        """
+        Runs several jobs, submitting them to the server concurrently.
+
+        Args:
+            :param job_specs: A list of GPJobSpec objects defining the jobs to be run.
+            :param wait_until_done: Whether to wait until all the jobs are finished before returning.
+            :param max_workers: The maximum number of jobs submitted at once.
+
+        Returns:
+            A list of GPJob objects in the same order as job_specs, with None in place
+            of any job that failed to submit.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            jobs = list(executor.map(lambda spec: self.run_job(spec, wait_until_done=False), job_specs))
+        submitted = [job for job in jobs if job is not None]
+        if submitted:
+            self.last_job = submitted[-1]
+        if wait_until_done:
+            self.wait_until_complete(submitted)
+        return jobs
+
     def get_token(self):
         """Return the authentication token, logging in to obtain it if necessary"""
         if self.token: return self.token
@@ -153,20 +356,46 @@ class GPServer(object):
         Queries the GenePattern server and returns a list of GPTask objects,
         each representing one of the modules installed on the server. Useful
         for determining which are available on the server.
+
+        The list is cached after the first call, use invalidate_task_cache()
+        to query the server again.
         """
-        request = urllib.request.Request(self.url + '/rest/v1/tasks/all.json')
-        if self.authorization_header() is not None:
-            request.add_header('Authorization', self.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        response = urllib.request.urlopen(request)
-        response_string = response.read().decode('utf-8')
-        category_and_tasks = json.loads(response_string)
-        raw_list = category_and_tasks['all_modules']
-        task_list = []
-        for task_dict in raw_list:
-            task = GPTask(self, task_dict['lsid'], task_dict)
-            task_list.append(task)
-        return task_list
+        if self._task_list is None:
+            category_and_tasks = _json_loads(self._request_cached(f'{self._tasks_url}/all.json'))
+            raw_list = category_and_tasks['all_modules']
+            task_list = []
+            for task_dict in raw_list:
+                task = GPTask(self, task_dict['lsid'], task_dict)
+                task_list.append(task)
+            self._task_list = task_list
+        return list(self._task_list)
+
+    def invalidate_task_cache(self):
+        """
+        Discards the cached task list and task metadata, so that they are queried
+        from the server the next time they are needed. Useful after modules have
+        been installed or updated on the server.
+        """
+        self._task_list = None
+        self._task_bodies = {}
+
+    def load_all_task_params(self, tasks, max_workers=8):
+        """
+        Loads the parameters and other metadata for each of the given tasks, querying
+        the server for several tasks at once rather than one after another.
+
+        Args:
+            :param tasks: A list of GPTask objects, such as returned by get_task_list()
+            :param max_workers: The maximum number of tasks queried at once
+
+        Returns:
+            :return: The list of tasks
+        """
+        unloaded = [task for task in tasks if not task._params_loaded]
+        if unloaded:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(unloaded))) as executor:
+                list(executor.map(lambda task: task.param_load(), unloaded))
+        return tasks
 
     @staticmethod
     def wait_until_complete(job_list):
@@ -178,17 +407,54 @@ class GPServer(object):
         an error state.
 
         This method will occasionally query each job to see if it is finished.
+        Unfinished jobs are queried concurrently.
+        """
+        pending = set(range(len(job_list)))
+        attempt = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(8, len(job_list)))) as executor:
+            while pending:
+                polled = list(pending)
+                finished = [i for i, done in zip(polled, executor.map(lambda i: job_list[i]._poll_finished(), polled)) if done]
+                pending.difference_update(finished)
+                if not pending:
+                    break
+
+                # Poll quickly again after any job finishes, otherwise back off,
+                # waiting longer between polls the more jobs are outstanding
+                attempt = 0 if finished else attempt + 1
+                time.sleep(max(_poll_interval(attempt), min(_POLL_MAX, _POLL_PER_JOB * len(pending))))
+
+    async def run_job_async(self, job_spec, wait_until_done=True):
+        """
+        Coroutine version of run_job(). Submitting the job is done on the event loop's
+        default executor and waiting uses GPJob.wait_until_done_async(), so that many
+        jobs can be run at once from one event loop.
+        """
+        job = await asyncio.get_event_loop().run_in_executor(None, self.run_job, job_spec, False)
+        if job is not None and wait_until_done:
+            await job.wait_until_done_async()
+        return job
+
+    @staticmethod
+    async def as_completed(job_list):
+        """
+        Asynchronous iterator over the given GPJob objects, yielding each job as it finishes
+        """
+        async def wait(job):
+            await job.wait_until_done_async()
+            return job
+
+        for future in asyncio.as_completed([wait(job) for job in job_list]):
+            yield await future
+
+    @staticmethod
+    async def wait_until_complete_async(job_list):
+        """
+        Coroutine version of wait_until_complete(). Polls every job concurrently
+        from the running event loop, each with its own backoff, and returns once
+        all the jobs have finished.
         """
-        complete = [False] * len(job_list)
-        wait = 1
-        while not all(complete):
-            time.sleep(wait)
-            for i, job in enumerate(job_list):
-                if not complete[i]:
-                    complete[i] = job.is_finished()
-                    if not complete[i]:
-                        break
-            wait = min(wait * 2, 10)
+        await asyncio.gather(*(job.wait_until_done_async() for job in job_list))
 
     def get_recent_jobs(self, n_jobs=10):
         """
@@ -200,28 +466,116 @@ class GPServer(object):
         """
 
         # Query the server for the list of jobs
-        request = urllib.request.Request(self.url + '/rest/v1/jobs/?pageSize=' +
-                                         str(n_jobs) + '&userId=' + str(urllib.parse.quote(self.username)) +
-                                         '&orderBy=-dateSubmitted')
-        if self.authorization_header() is not None:
-            request.add_header('Authorization', self.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        response = urllib.request.urlopen(request)
-        response_string = response.read().decode('utf-8')
-        response_json = json.loads(response_string)
+        response = self._request(f'{self._jobs_url}/?pageSize={n_jobs}&userId={self._safe_username}'
+                                 '&orderBy=-dateSubmitted')
+        response_json = _json_loads(response.body)
 
         # For each job in the JSON Array, build a GPJob object and add to the job list
+        # The listed status is as fresh as a status poll, so it counts towards the job's status cache.
+        # The rest of the listed info is only a summary, which get_info() replaces with the full info.
+        fetched_at = time.monotonic()
         job_list = []
         for job_json in response_json['items']:
             job_id = job_json['jobId']
             job = GPJob(self, job_id)
             job.info = job_json
+            job._info_fetched_at = fetched_at
             job.load_info()
             job_list.append(job)
 
         return job_list
 
 
+class _ConnectionPool(object):
+    """
+    Idle keep-alive connections to GenePattern servers, so that consecutive REST calls
+    reuse an open TCP/TLS connection instead of opening a new one for each call.
+    Safe to share between threads, each connection is only used by one request at a time.
+    """
+
+    def __init__(self, max_idle=10):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        """
+        Returns an idle connection to the host if one is available, otherwise a new connection,
+        along with whether the connection is being reused
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get((scheme, netloc))
+                if not idle:
+                    break
+                connection = idle.pop()
+            if not _is_dropped(connection):
+                return connection, True
+            connection.close()
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        if sys.version_info < (3, 7):  # The blocksize argument was added in Python 3.7
+            return connection_class(netloc), False
+        return connection_class(netloc, blocksize=_BLOCK_SIZE), False
+
+    def release(self, scheme, netloc, connection):
+        """
+        Returns a connection whose response has been fully read to the pool
+        """
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def _is_dropped(connection):
+    """
+    Returns whether the server has closed an idle connection. No response is pending on
+    an idle connection, so a readable socket means the server closed it (or misbehaved).
+    """
+    if connection.sock is None:
+        return True
+    try:
+        return bool(select.select([connection.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+def _decode_body(headers, body):
+    """
+    Returns the response body, decompressing it if the server sent it gzipped
+    """
+    if headers.get('Content-Encoding', '').lower() == 'gzip':
+        return gzip.decompress(body)
+    return body
+
+
+def _poll_interval(attempt):
+    """
+    Returns a randomized number of seconds to wait before polling a job again,
+    growing exponentially with the number of polls since its status last changed
+    """
+    return random.uniform(_POLL_MIN, min(_POLL_MAX, _POLL_MIN * _POLL_RATE ** attempt))
+
+
+def _is_proxied(parts):
+    """
+    Used to determine if urllib would send a request for the split URL through a proxy
+    """
+    return parts.scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(parts.netloc)
+
+
 class GPResource(object):
     """
     Base class for resources on a Gene Pattern server.
@@ -231,7 +585,8 @@ class GPResource(object):
     that resources such as downloading a file or info for a running or completed
     job.
     """
-    uri = None
+    # Resources are created in bulk (task lists, job lists), so don't give each one its own __dict__
+    __slots__ = ('uri', '__weakref__')
 
     def __init__(self, uri):
         self.uri = uri
@@ -243,7 +598,7 @@ class GPFile(GPResource):
 
     Wraps the URI of the file, and contains methods to download the file.
     """
-    server_data = None
+    __slots__ = ('server_data',)
 
     def __init__(self, server_data, uri):
         GPResource.__init__(self, uri)
@@ -261,6 +616,19 @@ class GPFile(GPResource):
 
             * getcode() - return the HTTP status code of the response
         """
+        try:
+            return self._open()
+        except urllib.error.HTTPError as e:
+            # A rejected token has most likely expired, log in again for a new one and retry once, like _request()
+            if e.code != 401 or self.server_data.token is None:
+                raise e
+            self.server_data.login()
+            return self._open()
+
+    def _open(self):
+        """
+        Opens the URL associated with the GPFile once, for open()
+        """
         request = urllib.request.Request(self.uri)
         if self.server_data.authorization_header() is not None:
             request.add_header('Authorization', self.server_data.authorization_header())
@@ -268,7 +636,7 @@ class GPFile(GPResource):
         try:
             return urllib.request.urlopen(request)
         except urllib.error.HTTPError as e:
-            if e.geturl():  # Handle S3 redirects if one is encountered
+            if e.code != 401 and e.geturl():  # Handle S3 redirects if one is encountered
                 return urllib.request.urlopen(urllib.request.Request(e.geturl()))
             else:
                 raise e
@@ -304,26 +672,38 @@ class GPJob(GPResource):
     Contains methods to get the info of the job, and to wait on a running job by
     polling the server until the job is completed.
     """
-    json = None  # Define the backing JSON string
-    info = None
-    server_data = None
-    task_name = None
-    task_lsid = None
-    user_id = None
-    job_number = None
-    status = None
-    date_submitted = None
-    log_files = None
-    output_files = None
-    num_output_files = None
-    children = None
-    input_params = None
+    __slots__ = ('info', 'server_data', 'task_name', 'task_lsid', 'user_id', 'job_number', 'status',
+                 'date_submitted', 'log_files', 'output_files', 'num_output_files', 'input_params',
+                 '_info_fetched_at', '_info_body', '_info_version', '_children', '_children_version',
+                 '_output_files_cache', '_tags_cache', '_comments_cache', '_input_params_cache')
+
+    # Seconds that fetched metadata is reused before querying the server again.
+    # Metadata for a finished job no longer changes and is reused indefinitely.
+    INFO_TTL = 1.0
 
     def __init__(self, server_data, uri):
         super(GPJob, self).__init__(str(uri))
         self.info = None
         self.server_data = server_data
+        self.task_name = None
+        self.task_lsid = None
+        self.user_id = None
         self.job_number = uri
+        self.status = None
+        self.date_submitted = None
+        self.log_files = None
+        self.output_files = None
+        self.num_output_files = None
+        self.input_params = None
+        self._info_fetched_at = 0
+        self._info_body = None
+        self._info_version = 0  # Incremented each time the job info changes
+        self._children = None
+        self._children_version = 0
+        self._output_files_cache = None
+        self._tags_cache = None
+        self._comments_cache = None
+        self._input_params_cache = None
 
     def get_info(self):
         """
@@ -338,17 +718,48 @@ class GPJob(GPResource):
             * URL of Log Files
             * URL of Output Files
             * Number of Output Files
+
+        Metadata fetched within the last GPJob.INFO_TTL seconds, or at any point
+        after the job finished, is reused. Call refresh() to always query the server.
+        The summary info of jobs created from a job listing is never reused, as it
+        lacks fields such as the input parameters.
         """
-        request = urllib.request.Request(self.server_data.url + "/rest/v1/jobs/" + self.uri + "?includeInputParams=true")
-        if self.server_data.authorization_header() is not None:
-            request.add_header('Authorization', self.server_data.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        response = urllib.request.urlopen(request)
+        # Only info fetched by refresh() is complete, and it is the only info that sets _info_body
+        if self._info_body is not None and (self._is_finished_locally() or
+                                            time.monotonic() - self._info_fetched_at < self.INFO_TTL):
+            return
+        self.refresh()
+
+    def refresh(self):
+        """
+        Query the GenePattern server for metadata regarding this job, even if it was
+        recently fetched, and assign that metadata to the properties on this GPJob object.
+        """
+        response = self.server_data._request(f"{self.server_data._jobs_url}/{self.uri}?includeInputParams=true")
+        self._info_fetched_at = time.monotonic()
 
-        self.json = response.read().decode('utf-8')
-        self.info = json.loads(self.json)
+        # Nothing to update if the job info hasn't changed since it was last fetched
+        if response.body == self._info_body:
+            return
+
+        self._info_body = response.body
+        self.info = _json_loads(response.body)
         self.load_info()
 
+    @property
+    def json(self):
+        """
+        The backing JSON string of the last job info fetched from the server,
+        decoded from the response only when accessed
+        """
+        return None if self._info_body is None else self._info_body.decode('utf-8')
+
+    def _is_finished_locally(self):
+        """
+        Returns whether the already fetched metadata says that the job has finished
+        """
+        return bool(self.info.get('status', {}).get('isFinished'))
+
     def load_info(self):
         """
         Parses the JSON object stored at GPJob.info and assigns its metadata to
@@ -365,18 +776,52 @@ class GPJob(GPResource):
         self.log_files = self.info['logFiles']
         self.output_files = self.info['outputFiles']
         self.num_output_files = self.info['numOutputFiles']
-        self.input_params = self.info['inputParams'] if 'inputParams' in self.info else None
+        self.input_params = self.info.get('inputParams')
+
+        # Children and output files are rebuilt from the new info the next time they are accessed
+        self._info_version += 1
 
-        # Create children, if relevant
-        self.children = self.get_child_jobs()
+    @property
+    def children(self):
+        """
+        The child jobs of this job as a list of GPJob objects, created from the job info
+        when first accessed and again whenever the info changes. None if the info isn't loaded.
+        """
+        if self.info is not None and self._children_version != self._info_version:
+            self._children = self._create_child_jobs()
+            self._children_version = self._info_version
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+        self._children_version = self._info_version
+
+    def _create_child_jobs(self):
+        """
+        Creates a GPJob object for each of the child jobs listed in the job info
+        """
+        child_list = []
+        for child in self.info.get('children', {}).get('items', []):
+            child_job = GPJob(self.server_data, child['jobId'])
+            child_job.info = child
+            child_job._info_fetched_at = self._info_fetched_at  # Only the status is reused, as for listed jobs
+            child_job.load_info()
+            child_list.append(child_job)
+        return child_list
 
     def get_input_params(self):
         """Return the input parameters used to launch the job"""
 
-        # Lazily load info
-        if self.info is None: self.get_info()
+        # Lazily load info, replacing the summary info of a listed job, which lacks the input parameters
+        if self.info is None or self._info_body is None:
+            self.get_info()
 
-        return { list(p.keys())[0]:list(p.values())[0] for p in self.input_params }
+        # Reuse the dict unless the job info has changed
+        if self._input_params_cache is None or self._input_params_cache[0] != self._info_version:
+            params = {name: value for param in self.input_params for name, value in param.items()}
+            self._input_params_cache = (self._info_version, params)
+        return dict(self._input_params_cache[1])
 
     def get_child_jobs(self):
         """
@@ -388,27 +833,63 @@ class GPJob(GPResource):
         if self.info is None:
             self.get_info()
 
-        # Lazily load children
-        if self.children:
-            return self.children
+        # Children are created lazily by the GPJob.children property
+        return self.children
+
+    def get_status(self):
+        """
+        Queries the server for the status of the job alone, which is much smaller
+        than the full metadata returned by get_info(). Returns the status dict,
+        with keys such as isFinished, hasError, isPending and statusMessage.
+        """
+        try:
+            response = self.server_data._request(f"{self.server_data._jobs_url}/{self.uri}/status.json")
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise e
+            # Fall back to the full job metadata on servers without the status endpoint
+            self.refresh()
+            return self.info['status']
+        return _json_loads(response.body)
+
+    def _refresh_status(self, max_age=None):
+        """
+        Brings GPJob.info up to date with the status of the job, fetching only the
+        status while the job runs and the full metadata once, when it has finished.
+        A status fetched less than max_age seconds ago, GPJob.INFO_TTL by default, is reused.
+        """
+        if self.info is None or 'status' not in self.info:
+            self.get_info()
+            return
+
+        # The status of a finished job won't change, and a recently fetched status is reused
+        if max_age is None:
+            max_age = self.INFO_TTL
+        if self._is_finished_locally() or time.monotonic() - self._info_fetched_at < max_age:
+            return
+
+        status = self.get_status()
+        self._info_fetched_at = time.monotonic()
+        if status.get('isFinished') and not self._is_finished_locally():
+            self.refresh()
         else:
-            if 'children' in self.info:
-                child_list = []
-                for child in self.info['children']['items']:
-                    child_job = GPJob(self.server_data, child['jobId'])
-                    child_job.info = child
-                    child_job.load_info()
-                    child_list.append(child_job)
-                return child_list
-            else:               # No children? Return empty list
-                return []
+            self.info['status'] = status
+            self.status = status.get('statusMessage', self.status)
+
+    def _poll_finished(self):
+        """
+        Queries the server for the status of the job, bypassing the cache since
+        wait loops space out their own polls, and returns whether it has finished
+        """
+        self._refresh_status(max_age=0)
+        return self._is_finished_locally()
 
     def is_finished(self):
         """
         Queries the server to check if the job has been completed.
         Returns True or False.
         """
-        self.get_info()
+        self._refresh_status()
 
         if 'status' not in self.info:
             return False
@@ -422,7 +903,7 @@ class GPJob(GPResource):
         Queries the server to check if the job has an error.
         Returns True or False.
         """
-        self.get_info()
+        self._refresh_status()
 
         if 'status' not in self.info:
             return False
@@ -436,7 +917,7 @@ class GPJob(GPResource):
         Queries the server to check if the job is pending.
         Returns True or False.
         """
-        self.get_info()
+        self._refresh_status()
 
         if 'status' not in self.info:
             return False
@@ -465,10 +946,11 @@ class GPJob(GPResource):
         if self.info is None:
             self.get_info()
 
-        if 'tags' in self.info:
-            return [structure['tag']['tag'] for structure in self.info['tags']]
-        else:
-            return []
+        # Reuse the list unless the job info has changed
+        if self._tags_cache is None or self._tags_cache[0] != self._info_version:
+            tags = [structure['tag']['tag'] for structure in self.info.get('tags', [])]
+            self._tags_cache = (self._info_version, tags)
+        return list(self._tags_cache[1])
 
     def get_comments(self):
         """
@@ -479,10 +961,11 @@ class GPJob(GPResource):
         if self.info is None:
             self.get_info()
 
-        if 'comments' in self.info:
-            return [structure['text'] for structure in self.info['comments']['comments']]
-        else:
-            return []
+        # Reuse the list unless the job info has changed
+        if self._comments_cache is None or self._comments_cache[0] != self._info_version:
+            comments = [structure['text'] for structure in self.info['comments']['comments']] if 'comments' in self.info else []
+            self._comments_cache = (self._info_version, comments)
+        return list(self._comments_cache[1])
 
     def get_output_files(self):
         """
@@ -494,10 +977,11 @@ class GPJob(GPResource):
         if self.info is None:
             self.get_info()
 
-        if 'outputFiles' in self.info:
-            return [GPFile(self.server_data, f['link']['href']) for f in self.info['outputFiles']]
-        else:
-            return []
+        # Reuse the GPFile objects unless the job info has changed
+        if self._output_files_cache is None or self._output_files_cache[0] != self._info_version:
+            files = [GPFile(self.server_data, f['link']['href']) for f in self.info.get('outputFiles', [])]
+            self._output_files_cache = (self._info_version, files)
+        return list(self._output_files_cache[1])
 
     def get_file(self, name):
         """
@@ -510,20 +994,48 @@ class GPJob(GPResource):
                 return f
         return None
 
+    async def get_status_async(self):
+        """
+        Coroutine version of get_status(). The request is made on the event loop's
+        default executor, so that the loop isn't blocked while it is waiting.
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, self.get_status)
+
+    async def is_finished_async(self):
+        """
+        Coroutine version of is_finished()
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, self.is_finished)
+
+    async def wait_until_done_async(self):
+        """
+        Coroutine version of wait_until_done(), which sleeps between polls
+        without blocking the event loop
+        """
+        attempt = 0
+        last_status = None
+        while not await asyncio.get_event_loop().run_in_executor(None, self._poll_finished):
+            if self.info['status'] != last_status:
+                attempt = 0
+                last_status = self.info['status']
+            await asyncio.sleep(_poll_interval(attempt))
+            attempt += 1
+
     def wait_until_done(self):
         """
         This method will not return until the job is either complete or has
         reached an error state. This queries the server periodically to check
         for an update in status.
         """
-        wait = 1
-        while True:
-            time.sleep(wait)
-            self.get_info()
-            if self.info['status']['isFinished']:
-                break
-            # implements a crude exponential back off
-            wait = min(wait * 2, 60)
+        attempt = 0
+        last_status = None
+        while not self._poll_finished():
+            # Poll quickly again whenever the status changes, otherwise back off
+            if self.info['status'] != last_status:
+                attempt = 0
+                last_status = self.info['status']
+            time.sleep(_poll_interval(attempt))
+            attempt += 1
 
     def get_job_status_url(self):
         """
@@ -533,33 +1045,19 @@ class GPJob(GPResource):
     
     def get_permissions(self):
         """Get the permissions object for the GP job"""
-        url = f'{self.server_data.url}/rest/v1/jobs/{self.job_number}/permissions'
-        request = urllib.request.Request(url)
-        if self.server_data.authorization_header() is not None:
-            request.add_header('Authorization', self.server_data.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-
-        response = urllib.request.urlopen(request)
-        return json.loads(response.read())
+        url = f'{self.server_data._jobs_url}/{self.job_number}/permissions'
+        return _json_loads(self.server_data._request(url).body)
         
     def set_permissions(self, permissions):
         """Set the group permissions for the job"""
-        url = f'{self.server_data.url}/rest/v1/jobs/{self.job_number}/permissions'
-        data = json.dumps(permissions).encode('utf8')
-        request = urllib.request.Request(url, data=data, method='PUT')
-        if self.server_data.authorization_header() is not None:
-            request.add_header('Authorization', self.server_data.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        urllib.request.urlopen(request)
+        url = f'{self.server_data._jobs_url}/{self.job_number}/permissions'
+        data = _json_dumps(permissions)
+        self.server_data._request(url, data, method='PUT')
 
     def terminate(self):
         """Terminate a running or pending job"""
-        url = f'{self.server_data.url}/rest/v1/jobs/{self.job_number}/terminate'
-        request = urllib.request.Request(url, method='DELETE')
-        if self.server_data.authorization_header() is not None:
-            request.add_header('Authorization', self.server_data.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        return urllib.request.urlopen(request).code == 200
+        url = f'{self.server_data._jobs_url}/{self.job_number}/terminate'
+        return self.server_data._request(url, method='DELETE').status == 200
 
 
 class GPJobSpec(object):
@@ -570,6 +1068,7 @@ class GPJobSpec(object):
     includes the LSID of the job, and the parameters.  Helper methods set
     the LSID and parameters.
     """
+    __slots__ = ('params', 'lsid', 'server_data')
 
     def __init__(self, server_data, lsid):
         self.params = []
@@ -601,58 +1100,57 @@ class GPTask(GPResource):
     components.
 
     """
-    json = None  # Define the backing JSON string
-    server_data = None
-    description = None
-    name = None
-    documentation = None
-    lsid = None
-    version = None
-    params = None
-    dto = None
-
-    _params_loaded = False
-    submit_json = None
-    job_spec = None
-    job = None
-    job_number = None
+    __slots__ = ('json', 'server_data', 'description', 'name', 'documentation', 'lsid', 'version', 'params',
+                 'dto', 'submit_json', 'job_spec', 'job', 'job_number', '_params_loaded', '_params_url')
 
     def __init__(self, server_data, name_or_lsid, task_dict=None):
         GPResource.__init__(self, name_or_lsid)
         self.server_data = server_data
+        self.json = None  # Define the backing JSON string
+        self.description = None
+        self.name = None
+        self.documentation = None
+        self.lsid = None
+        self.version = None
+        self.params = None
+        self.dto = None
+        self.submit_json = None
+        self.job_spec = None
+        self.job = None
+        self.job_number = None
+        self._params_loaded = False
+
+        # The URL of the task's metadata, escaped once here rather than on every load
+        self._params_url = None
+        if server_data is not None:
+            self._params_url = f'{server_data._tasks_url}/{urllib.parse.quote(name_or_lsid)}'
 
         # Initialize descriptive attributes if available
         if task_dict is not None:
-            if 'name' in task_dict:
-                self.name = task_dict['name']
-            if 'lsid' in task_dict:
-                self.lsid = task_dict['lsid']
-            if 'description' in task_dict:
-                self.description = task_dict['description']
-            if 'documentation' in task_dict:
-                self.documentation = task_dict['documentation']
-            if 'version' in task_dict:
-                self.version = task_dict['version']
+            self.name = task_dict.get('name', self.name)
+            self.lsid = task_dict.get('lsid', self.lsid)
+            self.description = task_dict.get('description', self.description)
+            self.documentation = task_dict.get('documentation', self.documentation)
+            self.version = task_dict.get('version', self.version)
 
     def param_load(self):
         """
         Queries the server for the parameter information and other metadata associated with
         this task
         """
-        escaped_uri = urllib.parse.quote(self.uri)
-        request = urllib.request.Request(self.server_data.url + '/rest/v1/tasks/' + escaped_uri)
-        if self.server_data.authorization_header() is not None:
-            request.add_header('Authorization', self.server_data.authorization_header())
-        request.add_header('User-Agent', 'GenePatternRest')
-        response = urllib.request.urlopen(request)
-        self.json = response.read().decode('utf-8')
-        self.dto = json.loads(self.json)
+        # Task metadata is cached by the server object, see GPServer.invalidate_task_cache()
+        body = self.server_data._task_bodies.get(self._params_url)
+        if body is None:
+            body = self.server_data._request_cached(self._params_url)
+            self.server_data._task_bodies[self._params_url] = body
+        self.json = body.decode('utf-8')
+        self.dto = _json_loads(body)
 
-        self.description = self.dto['description'] if 'description' in self.dto else ""
+        self.description = self.dto.get('description', "")
         self.name = self.dto['name']
-        self.documentation = self.dto['documentation'] if 'documentation' in self.dto else ""
+        self.documentation = self.dto.get('documentation', "")
         self.lsid = self.dto['lsid']
-        self.version = self.dto['version'] if 'version' in self.dto else ""
+        self.version = self.dto.get('version', "")
         self.params = []
         for param in self.dto['params']:
             self.params.append(GPTaskParam(self, param))
@@ -708,21 +1206,19 @@ class GPTaskParam(object):
     associated with a single task parameter (i.e., element from list
     returned by GPTask.getParameters)
     """
-    task = None
-    dto = None
-    name = None
-    description = None
-    attributes = None
+    # Tasks can have many parameters, so don't give each one its own __dict__
+    __slots__ = ('task', 'dto', 'name', 'description', 'attributes', '_choices_fetched_at')
+
+    # Seconds before dynamic choices that the server hadn't finished assembling are queried again
+    CHOICES_TTL = 30.0
 
     def __init__(self, task, dto):
         self.task = task
         self.dto = dto
         self.name = list(dto)[0]
-        if 'description' in dto[self.name]:
-            self.description = dto[self.name]['description']
-        else:
-            self.description = ''
+        self.description = dto[self.name].get('description', '')
         self.attributes = dto[self.name]['attributes']
+        self._choices_fetched_at = None
 
     def get_dto(self):
         """
@@ -742,11 +1238,7 @@ class GPTaskParam(object):
         Returns whether the parameter is optional or required
         :return: Return True if optional, False if required
         """
-        if (('optional' in self.attributes and bool(self.attributes['optional'].strip())) or
-                ('minValue' in self.attributes and self.attributes['minValue'] == 0)):
-            return True
-        else:
-            return False
+        return self._attr_nonempty('optional') is not None or self.attributes.get('minValue') == 0
 
     def get_description(self):
         """
@@ -779,10 +1271,7 @@ class GPTaskParam(object):
 
         """
 
-        if 'type' in self.attributes and self.attributes['type'] == 'PASSWORD':
-            return True
-        else:
-            return False
+        return self.attributes.get('type') == 'PASSWORD'
 
     def allow_multiple(self):
         """
@@ -792,20 +1281,13 @@ class GPTaskParam(object):
         # note that maxValue means "max number of values", and is an integer, not a string
         if ('maxValue' in self.attributes) and (self.attributes['maxValue'] > 1):
             return True
-        elif ('numValues' in self.attributes) and ('+' in self.attributes['numValues']):
-            return True
-        else:
-            return False
+        return '+' in self.attributes.get('numValues', '')
 
     def get_default_value(self):
         """
         Return the default value for the parameter. If here is no default value, return None
         """
-        if ('default_value' in self.attributes and
-                bool(self.attributes['default_value'].strip())):
-            return self.attributes['default_value']
-        else:
-            return None
+        return self._attr_nonempty('default_value')
 
     def is_choice_param(self):
         """
@@ -844,11 +1326,7 @@ class GPTaskParam(object):
         """
         if 'choiceInfo' not in self.dto[self.name]:
             raise GPException('not a choice parameter')
-        choice_info_dto = self.dto[self.name]['choiceInfo']
-        if 'selectedValue' in choice_info_dto:
-            return self.dto[self.name]['choiceInfo']['selectedValue']
-        else:
-            return None
+        return self.dto[self.name]['choiceInfo'].get('selectedValue')
 
     def allow_choice_custom_value(self):
         """
@@ -873,29 +1351,39 @@ class GPTaskParam(object):
 
         if 'choiceInfo' not in self.dto[self.name]:
             raise GPException('not a choice parameter')
-        if self.get_choice_status()[1] == "NOT_INITIALIZED":
+        # Query the server the first time, and again at most every CHOICES_TTL seconds while the
+        # server is still assembling the list, revalidating with the ETag of the previous response
+        if self.get_choice_status()[1] == "NOT_INITIALIZED" and (
+                self._choices_fetched_at is None or time.monotonic() - self._choices_fetched_at >= self.CHOICES_TTL):
             print(self.get_choice_status())
             print("choice status not initialized")
 
-            request = urllib.request.Request(self.get_choice_href())
-            if self.task.server_data.authorization_header() is not None:
-                request.add_header('Authorization', self.task.server_data.authorization_header())
-            request.add_header('User-Agent', 'GenePatternRest')
-            response = urllib.request.urlopen(request)
-            self.dto[self.name]['choiceInfo'] = json.loads(response.read().decode('utf-8'))
+            body = self.task.server_data._request_cached(self.get_choice_href())
+            self.dto[self.name]['choiceInfo'] = _json_loads(body)
+            self._choices_fetched_at = time.monotonic()
         return self.dto[self.name]['choiceInfo']['choices']
 
+    def iter_choices(self):
+        """
+        Yields the choices one at a time, querying the server if necessary
+        like get_choices(). Useful for stopping early in long choice lists.
+        """
+        yield from self.get_choices()
+
+    def find_choice(self, label):
+        """
+        Returns the choice dictionary with the given 'label', or None if no choice matches.
+        Throws an error if this is not a choice parameter.
+        """
+        return next((choice for choice in self.iter_choices() if choice['label'] == label), None)
+
     def get_alt_name(self):
         """
         Returns the alternate name of a parameter.
         Only pipeline prompt-when-run parameters
         can have alternate names and alternate descriptions
         """
-        if ('altName' in self.attributes and
-                bool(self.attributes['altName'].strip())):
-            return self.attributes['altName']
-        else:
-            return None
+        return self._attr_nonempty('altName')
 
     def get_alt_description(self):
         """
@@ -903,10 +1391,14 @@ class GPTaskParam(object):
         Only pipeline prompt-when-run parameters
         can have alternate names and alternate descriptions
         """
-        if 'altDescription' in self.attributes and bool(self.attributes['altDescription'].strip()):
-            return self.attributes['altDescription']
-        else:
-            return None
+        return self._attr_nonempty('altDescription')
+
+    def _attr_nonempty(self, key):
+        """
+        Returns the value of the attribute if it is a non-blank string, otherwise None
+        """
+        value = self.attributes.get(key)
+        return value if isinstance(value, str) and value.strip() else None
 
     @staticmethod
     def _is_string_true(test):
@@ -916,7 +1408,7 @@ class GPTaskParam(object):
         """
         if type(test) is bool:
             return test
-        return test.lower() in ('on', 'yes', 'true')
+        return test.lower() in _TRUTHY
 
 
 class GPException(Exception):
@@ -935,7 +1427,44 @@ class GPJSONEncoder(json.JSONEncoder):
     Custom JSON encoder for encoding GenePattern classes
     """
     def default(self, o):
-        if isinstance(o, GPFile):
-            return o.get_url()
+        return _json_default(o)
+
+
+def _json_default(o):
+    """
+    Returns a JSON-serializable representation of a GenePattern object, used by
+    GPJSONEncoder and by orjson
+    """
+    if isinstance(o, GPFile):
+        return o.get_url()
+
+    # Encode the types orjson handles natively the same way when falling back to json
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
 
+    # Leave out the server's private runtime state, such as its connection pool and caches
+    if isinstance(o, GPServer):
+        return {'__GPServer__': {name: value for name, value in o.__dict__.items() if not name.startswith('_')}}
+
+    # The GenePattern classes use __slots__ rather than a __dict__, so collect their attributes from the slots
+    if isinstance(o, (GPResource, GPJobSpec, GPTaskParam)):
+        slots = (name for cls in type(o).__mro__ for name in getattr(cls, '__slots__', ()) if name != '__weakref__')
+        return {'__{}__'.format(o.__class__.__name__): {name: getattr(o, name) for name in slots if hasattr(o, name)}}
+
+    if hasattr(o, '__dict__'):
         return {'__{}__'.format(o.__class__.__name__): o.__dict__}
+    raise TypeError('Object of type {} is not JSON serializable'.format(o.__class__.__name__))
+
+
+def _json_dumps(obj):
+    """
+    Serializes the object as UTF-8 encoded JSON, encoding GenePattern objects like GPJSONEncoder.
+    The output is the same with or without orjson: dates and dataclasses are passed to
+    _json_default() rather than encoded by orjson, and json writes the same compact UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS |
+                            orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(obj, cls=GPJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
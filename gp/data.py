@@ -1,8 +1,3 @@
-__authors__ = ['Thorin Tabor']
-__copyright__ = 'Copyright 2014-2022, Regents of the University of California & Broad Institute'
-__version__ = '0.1.2'
-__status__ = 'Beta'
-
 """
 GenePattern Data Tools
 
@@ -12,28 +7,225 @@ working with their contents in a Pandas DataFrame.
 Compatible with Python 3.4+
 """
 
+__authors__ = ['Thorin Tabor']
+__copyright__ = 'Copyright 2014-2022, Regents of the University of California & Broad Institute'
+__version__ = '0.1.2'
+__status__ = 'Beta'
+
 import gp
+import os
 import re
 import io
-import types
-import pandas as pd
+import bz2
+import gzip
+import hashlib
+import threading
+import collections
+import importlib.util
+import concurrent.futures
+import urllib.error
 import urllib.request
+from contextlib import closing
+
+# Pandas is only needed to parse GCT and ODF files, so gp.data can be imported without it
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# urllib3 is optional, if installed URLs are fetched over pooled keep-alive connections
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
 
+# Buffer size used when reading from files and URLs
+_BUFFER_SIZE = 1 << 20
 
-def GCT(gct_obj):
+# Number of rows parsed at a time when filtering a GCT file by gene
+_CHUNK_SIZE = 100000
+
+# Directory used to cache parsed GCT files as Parquet
+_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'genepattern')
+
+# Default total size of the downloaded files kept in memory once enabled by set_url_cache_size()
+_URL_CACHE_MAX_BYTES = 1 << 28
+
+# Files downloaded by _open_url(), most recently used last, mapping each URL to its
+# revalidation headers and body, and the total size of the bodies they may hold
+_url_cache = collections.OrderedDict()
+_url_cache_max_bytes = 0
+_url_cache_lock = threading.Lock()
+
+# Keep-alive connections shared by every URL fetched by _open_url(), if urllib3 is installed
+_HTTP_POOL = urllib3.PoolManager(num_pools=4, maxsize=16) if urllib3 is not None else None
+
+# Values read as missing by the polars and pyarrow GCT parsers, the same ones pandas' own parsers recognize
+_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>',
+              'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# ODF headers which _header_dict_to_str() writes in a fixed position rather than sorted with the rest
+_ODF_SPECIAL_HEADERS = frozenset(['HeaderLines', 'COLUMN_NAMES', 'COLUMN_TYPES', 'Model', 'DataLines'])
+
+# Matches an ODF header line, splitting it into a key and value at the first equals sign or colon
+_ODF_HEADER_RE = re.compile(r'^\s*([^=:\s][^=:]*?)\s*[=:]\s*(.*?)\s*$')
+
+# URL schemes which _obtain_io() will fetch using urlopen()
+_URL_SCHEMES = ('http://', 'https://', 'ftp://', 'ftps://')
+
+# Compiled once at import, used to determine if a given string is a well-formed URL
+_URL_RE = re.compile(
+    r'^(?:http|ftp)s?://'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'  # domain...
+    r'localhost|'  # localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'(?::\d+)?'  # optional port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+
+if pd is not None:
+    class GPDataFrame(pd.DataFrame):
+        """
+        A Dataframe returned by GCT() or ODF(), adding the row_count() and col_count()
+        methods and, for ODF files, the headers and model attributes.
+        The attributes are carried along to Dataframes derived from this one.
+        """
+        _metadata = ['headers', 'model', '_id_column']
+        headers = None
+        model = None
+        _id_column = None
+
+        @property
+        def _constructor(self):
+            return GPDataFrame
+
+        def row_count(self):
+            """
+            :return: The number of rows
+            """
+            return len(self.index)
+
+        def col_count(self):
+            """
+            :return: The number of data columns, not counting a GCT file's Description column
+            """
+            return len(self.columns) - (1 if self._id_column is not None and self._id_column in self.columns else 0)
+
+
+def GCT(gct_obj, dtype='float32', engine='c', samples=None, genes=None, multiindex=True, n_jobs=1,
+        cache=False):
     """
     Create a Dataframe with the contents of the GCT file
+
+    :gct_obj: The GCT file. Accepts a file-like object, a file path, a URL to the file
+              or a string containing the raw data.
+    :dtype: The type used for the expression values. Defaults to float32, which
+            halves memory use; pass float64 if the extra precision is needed.
+    :engine: The parser used for the data lines. Either 'c' (the default), 'python',
+             or one of the optional multithreaded backends 'pyarrow' or 'polars',
+             which are faster on large files. Falls back to 'c' if not installed.
+             Pass 'auto' to use polars or pyarrow whenever one is installed.
+    :samples: Optional list of sample columns to load. Other columns are skipped at read time.
+    :genes: Optional list of row names to load. Other rows are discarded as the file is read.
+    :multiindex: Index rows by both Name and Description (the default). If False, rows are
+                 indexed by Name alone and Description is kept as a regular column, which
+                 avoids building a MultiIndex and is cheaper for large files.
+    :n_jobs: Number of processes used to parse a local, uncompressed GCT file. Each process
+             parses its own byte range of the file. Pass os.cpu_count() to use every core.
+    :cache: If True, keep a Parquet copy of a parsed local GCT file in ~/.cache/genepattern
+            and load from it on later calls, until the GCT file is modified. Requires pyarrow.
     """
+    _require_pandas()
+
+    # Use the fastest installed parser if asked to pick one
+    if engine == 'auto':
+        engine = _auto_engine()
+
+    # Load from the Parquet cache if this file has already been parsed with the same options
+    # A file that can't be found is skipped here, and reported when it is opened below
+    cache_path = None
+    if cache and _is_path(gct_obj) and _has_module('pyarrow'):
+        try:
+            cache_path = _gct_cache_path(gct_obj, dtype, engine, samples, genes, multiindex)
+        except OSError:
+            pass
+        if cache_path is not None and os.path.exists(cache_path):
+            return _gct_frame(pd.read_parquet(cache_path))
+
     # Handle all the various initialization types and get an IO object
     gct_io = _obtain_io(gct_obj)
 
-    # Load the GCT file into a DataFrame
-    df = pd.read_csv(gct_io, sep='\t', header=2, index_col=[0, 1], skip_blank_lines=True)
+    # Read the column names from the header, leaving the IO object positioned at the data
+    column_names = _read_gct_header(gct_io)
+
+    # Declare the fixed GCT schema so that the parser can skip type inference,
+    # storing the ID columns as Arrow strings when an Arrow-based parser was requested
+    arrow_strings = engine in ('pyarrow', 'polars') and _has_module('pyarrow')
+    column_types = _gct_column_types(column_names, dtype, 'string[pyarrow]' if arrow_strings else str)
+
+    # Only read the Name, Description and requested sample columns
+    usecols = None if samples is None else column_names[:2] + list(samples)
+
+    # Index by Name and Description, or by Name alone
+    index_col = [0, 1] if multiindex else 0
+
+    # Load the GCT file into a DataFrame, filtering rows chunk by chunk if only some genes were requested
+    local_file = _is_path(gct_obj) and engine in ('c', 'python') and not _is_compressed(gct_io)
+    if genes is None and local_file and n_jobs > 1:
+        # Split the data lines into byte ranges and parse them in separate processes
+        data_start = gct_io.tell()
+        gct_io.close()
+        df = _read_gct_parallel(gct_obj, data_start, column_names, column_types, engine, usecols, index_col, n_jobs)
+    elif genes is None and local_file:
+        # Memory map local files, which requires giving the parser the path rather than the open file
+        gct_io.close()
+        df = pd.read_csv(gct_obj, sep='\t', engine=engine, header=None, names=column_names, index_col=index_col,
+                         usecols=usecols, dtype=column_types, skip_blank_lines=True, skiprows=3, memory_map=True)
+    elif genes is None:
+        df = _read_gct_body(gct_io, column_names, column_types, engine, usecols, index_col)
+    else:
+        genes = set(genes)
+        df = pd.concat([chunk[chunk.index.get_level_values(0).isin(genes)] for chunk in
+                        _read_gct_chunks(gct_io, column_names, column_types, _CHUNK_SIZE, usecols, index_col)])
+
+    # Apply GCT-specific properties
+    df = _gct_frame(df)
+
+    # Save to the Parquet cache, a failure here shouldn't prevent returning the parsed file
+    if cache_path is not None:
+        _write_gct_cache(df, cache_path)
 
     # Return the Dataframe
     return df
 
 
+def iter_gct(gct_obj, chunksize=100000, dtype='float32', multiindex=True):
+    """
+    Iterate over the contents of the GCT file as a series of Dataframes, each
+    holding at most chunksize rows. Useful for GCT files too large to fit in memory.
+
+    :gct_obj: The GCT file. Accepts a file-like object, a file path, a URL to the file
+              or a string containing the raw data.
+    :chunksize: The maximum number of rows in each Dataframe
+    :dtype: The type used for the expression values
+    :multiindex: Index rows by both Name and Description, or by Name alone if False
+    """
+    _require_pandas()
+
+    # Handle all the various initialization types and get an IO object
+    gct_io = _obtain_io(gct_obj)
+
+    # Read the column names from the header and declare the schema
+    column_names = _read_gct_header(gct_io)
+    column_types = _gct_column_types(column_names, dtype)
+
+    # Lazily read and yield each chunk of rows
+    index_col = [0, 1] if multiindex else 0
+    for chunk in _read_gct_chunks(gct_io, column_names, column_types, chunksize, None, index_col):
+        yield chunk
+
+
 class CLS:
     def __init__(self, cls_obj):
         """
@@ -46,22 +238,17 @@ class CLS:
                   or a string containing the raw data.
         """
 
-        hdr_line_re = re.compile(r"^(?P<samples>[0-9]+)\s+(?P<classes>[0-9]+)\s+1\s*$")
-        assign_line_re = re.compile(r"^\s*(?:.+\s+)*.+\s*$", re.ASCII)
-
         # Handle all the various initialization types and get an IO object
         cls_io = _obtain_io(cls_obj)
 
-        # Read the file as an array of lines
-        raw_lines = cls_io.readlines()
-
-        # Convert byte strings to unicode strings
-        raw_lines = _bytes_to_str(raw_lines)
+        # Read the file as an array of unicode lines
+        raw_lines = _read_text_lines(cls_io)
 
         # Validate cls file format and contents
-        hdr_line_match = re.match(hdr_line_re, raw_lines[0])
-        if hdr_line_match:
-            (self.num_samples, self.num_classes) = (int(hdr_line_match["samples"]), int(hdr_line_match["classes"]))
+        # The header line holds the number of samples, the number of classes and a 1
+        hdr_parts = raw_lines[0].split()
+        if len(hdr_parts) == 3 and hdr_parts[0].isdigit() and hdr_parts[1].isdigit() and hdr_parts[2] == '1':
+            (self.num_samples, self.num_classes) = (int(hdr_parts[0]), int(hdr_parts[1]))
 
             self.class_names = raw_lines[1].replace('#', '').split()
             if len(self.class_names) != self.num_classes:
@@ -70,16 +257,16 @@ class CLS:
         else:
             raise ValueError("Bad format in {0} for header line: {1}".format(cls_obj, raw_lines[0]))
 
-        assign_line_match = re.match(assign_line_re, raw_lines[2])
-        if assign_line_match:
-            self.class_assignments = [i for i in raw_lines[2].split()]
+        assign_parts = raw_lines[2].split()
+        if assign_parts:
+            self.class_assignments = assign_parts
             if self.num_samples != len(self.class_assignments):
                 raise ValueError("Mismatch in {0} between number of samples declared ({1}) and number of class assignments provided ({2})".format(cls_obj, self.num_samples, len(self.class_assignments)))
         else:
             raise ValueError("Bad format in {0} for class assignment line: {1}".format(cls_obj, raw_lines[2]))
 
 
-def ODF(odf_obj):
+def ODF(odf_obj, engine='c'):
     """
     Create a Dataframe with the contents of the ODF file
 
@@ -88,23 +275,23 @@ def ODF(odf_obj):
 
     :odf_obj: The ODF file. Accepts a file-like object, a file path, a URL to the file
               or a string containing the raw data.
+    :engine: The parser used for the data lines. Either 'c' (the default), 'python'
+             for malformed files, or 'pyarrow' for multithreaded parsing of large
+             files. Falls back to 'c' if pyarrow is not installed. Pass 'auto' to
+             use pyarrow whenever it is installed.
     """
+    _require_pandas()
+
+    # Use the fastest installed parser if asked to pick one, polars isn't supported for ODF files
+    if engine == 'auto':
+        engine = _auto_engine(polars=False)
 
     # Handle all the various initialization types and get an IO object
     odf_io = _obtain_io(odf_obj)
 
-    # Read the file as an array of lines
-    raw_lines = odf_io.readlines()
-
-    # Convert byte strings to unicode strings
-    raw_lines = _bytes_to_str(raw_lines)
-
     try:
-        # Read the header count
-        header_count = _extract_header_number(raw_lines)
-
-        # Read the header dict
-        headers = _parse_header(raw_lines)
+        # Read the header dict, leaving the IO object positioned at the data
+        headers, header_lines = _parse_header(odf_io)
 
         # Read the model
         model = _extract_model(headers)
@@ -112,17 +299,17 @@ def ODF(odf_obj):
         # Read the column names, if available
         column_names = _extract_column_names(headers)
 
-        # Assemble the data
-        data_lines = _join_data_lines(raw_lines, header_count)
-
-        # Put together new IO
-        odf_string_io = io.StringIO(data_lines)
-
-        # Load the ODF file into a DataFrame
-        df = pd.read_csv(odf_string_io, sep='\t', header=None, names=column_names, skip_blank_lines=True)
+        # Load the data lines into a DataFrame, memory mapping local files, which requires giving
+        # the parser the path rather than the open file, and otherwise streaming them from the IO object
+        if _is_path(odf_obj) and engine in ('c', 'python') and not _is_compressed(odf_io):
+            odf_io.close()
+            df = pd.read_csv(odf_obj, sep='\t', engine=engine, header=None, names=column_names, index_col=False,
+                             skip_blank_lines=True, skiprows=header_lines, memory_map=True)
+        else:
+            df = _read_odf_body(odf_io, column_names, engine)
 
         # Apply ODF-specific properties
-        _apply_odf_properties(df, headers, model)
+        df = _odf_frame(df, headers, model)
 
         # Return the Dataframe
         return df
@@ -131,6 +318,29 @@ def ODF(odf_obj):
     except Exception:
         raise TypeError('Error parsing ODF file')
 
+
+def load_many(objs, kind='gct', max_workers=8, **kwargs):
+    """
+    Create a Dataframe for each of several GCT or ODF files, loading them
+    concurrently so that downloads from a server overlap
+
+    :objs: The list of files. Accepts anything that GCT() or ODF() accepts.
+    :kind: The type of the files, either 'gct' (the default) or 'odf'
+    :max_workers: The maximum number of files loaded at once
+    :kwargs: Passed along to GCT() or ODF() for every file, such as dtype or engine
+    :return: The list of Dataframes, in the same order as objs
+    """
+    loaders = {'gct': GCT, 'odf': ODF}
+    if kind not in loaders:
+        raise ValueError("Unknown kind '{0}', expected 'gct' or 'odf'".format(kind))
+    loader = loaders[kind]
+
+    objs = list(objs)
+    if not objs:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(objs))) as executor:
+        return list(executor.map(lambda obj: loader(obj, **kwargs), objs))
+
 ############################
 # Shared Utility Functions #
 ############################
@@ -148,9 +358,9 @@ def write_odf(df, file_path, headers=None):
     :param headers: A dict of ODF headers, if none are provided will attempt to read them from the ODF file
     :return:
     """
-    if headers is None and hasattr(df, 'headers'):
-        headers = df.headers
-    else:
+    if headers is None:
+        headers = getattr(df, 'headers', None)
+    if headers is None:
         raise AttributeError('ODF headers not provided')
 
     with open(file_path, 'w') as file:
@@ -170,64 +380,165 @@ def write_gct(df, file_path):
     :return:
     """
     with open(file_path, 'w') as file:
-        file.write('#1.2\n' + str(len(df.index)) + '\t' + str(len(df.columns)) + '\n')
+        file.write('#1.2\n' + str(len(df.index)) + '\t' + str(_gct_sample_count(df)) + '\n')
         df.to_csv(file, sep='\t', mode='w+')
 
 
+def set_url_cache_size(max_bytes=_URL_CACHE_MAX_BYTES):
+    """
+    Keep GCT, ODF and CLS files downloaded from a URL in memory, up to a total of max_bytes
+    (256 MiB by default), so that loading them again only asks the server whether they have
+    changed. Files the server cannot revalidate, or which are too large, are never kept.
+    The cache is disabled until this is called, and passing 0 disables it again.
+    """
+    global _url_cache_max_bytes
+    with _url_cache_lock:
+        _url_cache_max_bytes = max_bytes
+        _trim_url_cache()
+
+
+def clear_cache():
+    """
+    Forget the GCT, ODF and CLS files kept in memory after being downloaded from a URL,
+    so that the next load downloads them again. The Parquet cache used by GCT(cache=True)
+    is kept on disk and is not affected.
+    """
+    with _url_cache_lock:
+        _url_cache.clear()
+
+
 def _is_url(url):
     """
-    Used to determine if a given string represents a URL
-    """
-    regex = re.compile(
-        r'^(?:http|ftp)s?://'  # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'  # domain...
-        r'localhost|'  # localhost...
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-        r'(?::\d+)?'  # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-    if regex.match(url) is not None:
-        return True
-    else:
-        return False
+    Used to determine if a given string represents a URL. Only the scheme is
+    checked, as that is all that is needed to choose between urlopen() and open().
+    """
+    return url[:8].lower().startswith(_URL_SCHEMES)
 
 
-def _obtain_io(init_obj):
-    io_obj = None
+def _is_url_strict(url):
+    """
+    Used to determine if a given string represents a fully well-formed URL
+    """
+    return _URL_RE.match(url) is not None
 
-    # Check to see if init_obj is a GPFile object from the GenePattern Python Client
-    if isinstance(init_obj, gp.GPFile):
-        io_obj = init_obj.open()
 
-    # Check to see if init_obj is a file-like object
-    # Skip if a file-like object has already been obtained
-    if hasattr(init_obj, 'read') and io_obj is None:
-        io_obj = init_obj
+def _is_path(init_obj):
+    """
+    Used to determine if _obtain_io() will treat the given object as a local file path
+    """
+    return isinstance(init_obj, str) and '\n' not in init_obj and not _is_url(init_obj)
+
+
+def _decompress(io_obj):
+    """
+    Wrap a buffered binary stream so that gzip or bzip2 compressed data is
+    decompressed incrementally as it is read, detected by its magic bytes
+    """
+    magic = io_obj.peek(3)[:3]
+    if magic.startswith(b'\x1f\x8b'):
+        return gzip.GzipFile(fileobj=io_obj)
+    if magic == b'BZh':
+        return bz2.BZ2File(io_obj)
+    return io_obj
+
+
+def _is_compressed(io_obj):
+    """
+    Used to determine if _obtain_io() wrapped the stream to decompress it
+    """
+    return isinstance(io_obj, (gzip.GzipFile, bz2.BZ2File))
+
+
+def _at_end(io_obj):
+    """
+    Used to determine if nothing is left to read from the IO object, checked without
+    consuming anything. Returns False if the object can neither peek nor seek.
+    """
+    if hasattr(io_obj, 'peek'):
+        return not io_obj.peek(1)
+    if hasattr(io_obj, 'seekable') and io_obj.seekable():
+        position = io_obj.tell()
+        at_end = not io_obj.read(1)
+        io_obj.seek(position)
+        return at_end
+    return False
+
+
+def _has_module(name):
+    """
+    Used to determine if an optional dependency is installed, without importing it
+    """
+    return importlib.util.find_spec(name) is not None
+
+
+def _auto_engine(polars=True):
+    """
+    Return the fastest installed parser: polars, then pyarrow, then pandas' C parser
+    """
+    if polars and _has_module('polars') and _has_module('pyarrow'):
+        return 'polars'
+    if _has_module('pyarrow'):
+        return 'pyarrow'
+    return 'c'
+
+
+def _pandas_engine(engine):
+    """
+    Return the pandas read_csv() engine to use for the requested parser, falling
+    back to 'c' if it is not one pandas supports or its module is not installed
+    """
+    if engine in ('c', 'python') or (engine == 'pyarrow' and _has_module('pyarrow')):
+        return engine
+    return 'c'
 
-    # Check to see if gct_obj is a string
-    # Skip if a file-like object has already been obtained
-    if isinstance(init_obj, str) and io_obj is None:
+
+def _require_pandas():
+    """
+    Raise an ImportError if pandas, which is needed to load GCT and ODF files, is not installed
+    """
+    if pd is None:
+        raise ImportError('pandas is required to load GCT and ODF files')
+
+
+def _obtain_io(init_obj):
+    io_obj = None
+
+    # Check to see if init_obj is a string, the most common case
+    if isinstance(init_obj, str):
 
         # Check to see if the string contains multiple lines
         # If it does, it is likely raw data
         if '\n' in init_obj:
-            # Wrap the raw data in a StringIO (file-like object)
-            io_obj = io.StringIO(init_obj)
+            # Wrap the raw data as UTF-8 bytes, which the C parser consumes without transcoding
+            io_obj = io.BytesIO(init_obj.encode('utf-8'))
 
         # Check to see if the string contains a URL
         # Skip if a file-like object has already been obtained
-        if _is_url(init_obj) and io_obj is None:
-            io_obj = urllib.request.urlopen(init_obj)
+        # Buffer the response so that the parser consumes it in large reads
+        elif _is_url(init_obj):
+            io_obj = _decompress(_open_url(init_obj))
 
         # Otherwise try treating the string as a file path
         # If this doesn't work throw an error, we don't know what to do with this string.
-        # Skip if a file-like object has already been obtained
-        if io_obj is None:
+        else:
             try:
-                # Point gct_obj to file (read in the code below)
-                io_obj = open(init_obj, 'r')
+                # Point gct_obj to file (read in the code below), decoding is left to the parser
+                io_obj = _decompress(open(init_obj, 'rb', buffering=_BUFFER_SIZE))
             except IOError:
                 raise IOError('Input string not determined to be raw data, URL or readable file.')
 
+    # Check to see if init_obj is a GPFile object from the GenePattern Python Client
+    elif isinstance(init_obj, gp.GPFile):
+        io_obj = _decompress(io.BufferedReader(init_obj.open(), buffer_size=_BUFFER_SIZE))
+
+    # Check to see if init_obj is a file object
+    elif isinstance(init_obj, io.IOBase):
+        io_obj = init_obj
+
+    # Fall back to duck typing for file-like objects that don't derive from io.IOBase
+    elif hasattr(init_obj, 'read'):
+        io_obj = init_obj
+
     # If we still don't have a file-like object at this point, throw an error
     if io_obj is None:
         raise TypeError('Unknown type passed to GCT() or ODF()')
@@ -236,56 +547,308 @@ def _obtain_io(init_obj):
     return io_obj
 
 
+def _open_url(url):
+    """
+    Open a URL as a buffered binary stream. If set_url_cache_size() has enabled it, files that
+    the server can revalidate are kept in memory, and reused as long as the server reports them unchanged.
+    """
+    with _url_cache_lock:
+        max_bytes = _url_cache_max_bytes
+        cached = _url_cache.get(url)
+
+    try:
+        response = _urlopen(url, cached[0] if cached is not None else {})
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or cached is None:  # urllib reports 304 as an error
+            raise e
+        with _url_cache_lock:
+            if url in _url_cache:
+                _url_cache.move_to_end(url)
+        return io.BufferedReader(io.BytesIO(cached[1]))
+
+    # Only keep files that can be revalidated and whose size is known to fit in the cache,
+    # streaming the rest from the response rather than reading them into memory
+    validators = {}
+    if response.headers.get('ETag'):
+        validators['If-None-Match'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validators['If-Modified-Since'] = response.headers['Last-Modified']
+    length = response.headers.get('Content-Length')
+    if not validators or length is None or not length.isdigit() or int(length) > max_bytes:
+        with _url_cache_lock:
+            _url_cache.pop(url, None)
+        return io.BufferedReader(response, buffer_size=_BUFFER_SIZE)
+
+    with closing(response):
+        body = response.read()
+    with _url_cache_lock:
+        _url_cache[url] = (validators, body)
+        _url_cache.move_to_end(url)
+        _trim_url_cache()
+    return io.BufferedReader(io.BytesIO(body))
+
+
+def _trim_url_cache():
+    """
+    Forget the least recently used downloaded files until the rest fit in the cache.
+    Must be called holding _url_cache_lock.
+    """
+    total = sum(len(body) for _, body in _url_cache.values())
+    while total > _url_cache_max_bytes:
+        _, (_, body) = _url_cache.popitem(last=False)
+        total -= len(body)
+
+
+def _urlopen(url, headers):
+    """
+    Open the URL with a GET request, using the shared urllib3 connection pool if urllib3
+    is installed and no proxy is configured. Like urlopen(), raises HTTPError for a 304
+    or error status and otherwise returns a file-like response with a headers attribute.
+    """
+    scheme = url.split(':', 1)[0].lower()
+    if _HTTP_POOL is None or scheme not in ('http', 'https') or scheme in urllib.request.getproxies():
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+
+    response = _HTTP_POOL.request('GET', url, headers=headers, preload_content=False)
+    if response.status == 304 or response.status >= 400:
+        response.drain_conn()
+        response.release_conn()
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+    # Stay open once the body has been read, as the parser still reads from the buffer around it
+    response.auto_close = False
+    return response
+
+
 #########################
-# ODF Utility Functions #
+# GCT Utility Functions #
 #########################
 
 
-def _header_dict_to_str(headers):
-    # Define the list of headers to handle as special cases
-    special = ['HeaderLines', 'COLUMN_NAMES', 'COLUMN_TYPES', 'Model', 'DataLines']
+def _read_gct_header(gct_io):
+    """
+    Read the three GCT header lines and return the list of column names. The declared
+    dimensions on the second line are not used, and are skipped without being checked.
+    Leaves the IO object positioned at the first data line.
+    """
+    lines = _bytes_to_str([gct_io.readline() for _ in range(3)])
+    return lines[2].rstrip('\r\n').split('\t')
+
+
+def _gct_frame(df):
+    """
+    Return the parsed GCT file as a GPDataFrame, noting the Description column
+    when it is a regular column rather than part of the index
+
+    :param df: The parsed dataframe
+    """
+    df = GPDataFrame(df)
+    df._id_column = df.columns[0] if df.index.nlevels == 1 and len(df.columns) else None
+    return df
+
+
+def _gct_sample_count(df):
+    """
+    Return the number of sample columns in a GCT Dataframe, which does not
+    include Description when it is a regular column rather than part of the index
+    """
+    return len(df.columns) - (1 if df.index.nlevels == 1 else 0)
+
+
+def _gct_column_types(column_names, dtype, string_dtype=str):
+    """
+    Return the dtype map for a GCT file: string Name and Description columns
+    followed by the expression values
+    """
+    column_types = {name: dtype for name in column_names[2:]}
+    column_types.update({column_names[0]: string_dtype, column_names[1]: string_dtype})
+    return column_types
+
+
+def _read_gct_body(gct_io, column_names, column_types, engine, usecols, index_col):
+    """
+    Parse the GCT data lines into a DataFrame indexed by the index_col columns,
+    using the requested parser backend if it is installed
+    """
+    # polars and pyarrow reject a file with no data lines, which the C parser reads as an empty frame
+    if engine in ('polars', 'pyarrow') and _at_end(gct_io):
+        engine = 'c'
+
+    wanted = set(usecols or column_names)
+    selected = [name for name in column_names if name in wanted]
+    index_names = [selected[i] for i in index_col] if isinstance(index_col, list) else selected[index_col]
+
+    # Polars returns its own DataFrame, which is converted to pandas by way of pyarrow,
+    # keeping one block per column and releasing the Arrow buffers as they are converted.
+    # The schema is declared up front so that IDs such as 00001 stay strings rather than being inferred as numbers.
+    if engine == 'polars' and _has_module('polars') and _has_module('pyarrow'):
+        import polars as pl
+        float_type = {'float32': pl.Float32, 'float64': pl.Float64}
+        schema = {name: pl.Utf8 if name in column_names[:2] else float_type.get(str(column_types[name]), pl.Float64)
+                  for name in column_names}
+        df = pl.read_csv(gct_io, separator='\t', has_header=False, new_columns=column_names, schema_overrides=schema,
+                         columns=[i for i, name in enumerate(column_names) if name in wanted],
+                         null_values=_NA_VALUES)
+        df = df.to_pandas(split_blocks=True, self_destruct=True)
+        return df.astype({name: column_types[name] for name in selected}).set_index(index_names)
+
+    # Read with pyarrow directly rather than through pandas, which only applies the declared types after
+    # pyarrow has inferred its own, and which cannot combine explicit column names with usecols
+    if engine == 'pyarrow' and _has_module('pyarrow'):
+        import pyarrow
+        import pyarrow.csv
+        schema = {name: pyarrow.string() if name in column_names[:2] else pyarrow.from_numpy_dtype(column_types[name])
+                  for name in column_names}
+        if isinstance(gct_io.read(0), str):  # pyarrow only reads binary streams
+            gct_io = io.BytesIO(gct_io.read().encode('utf-8'))
+        table = pyarrow.csv.read_csv(
+            gct_io, read_options=pyarrow.csv.ReadOptions(column_names=column_names),
+            parse_options=pyarrow.csv.ParseOptions(delimiter='\t'),
+            convert_options=pyarrow.csv.ConvertOptions(column_types=schema, include_columns=selected,
+                                                       null_values=_NA_VALUES, strings_can_be_null=True))
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        return df.astype({name: column_types[name] for name in selected}).set_index(index_names)
+
+    # Otherwise let pandas drive the parse
+    return pd.read_csv(gct_io, sep='\t', engine=_pandas_engine(engine), header=None, names=column_names, index_col=index_col,
+                       usecols=usecols, dtype=column_types, skip_blank_lines=True)
+
+
+def _read_gct_chunks(gct_io, column_names, column_types, chunksize, usecols, index_col):
+    """
+    Return an iterator over the GCT data lines, parsed into DataFrames of at most chunksize rows
+    """
+    return pd.read_csv(gct_io, sep='\t', engine='c', header=None, names=column_names, index_col=index_col,
+                       usecols=usecols, dtype=column_types, skip_blank_lines=True, chunksize=chunksize)
+
+
+def _gct_cache_path(path, dtype, engine, samples, genes, multiindex):
+    """
+    Return the Parquet cache location for a GCT file, keyed by the file's path,
+    modification time and size along with the options used to load it.
+    The engine is included as it decides how the Name and Description columns are stored.
+    """
+    stat = os.stat(path)
+    key = '{}-{}-{}-{}-{}-{}-{}-{}'.format(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, dtype, engine,
+                                           samples, None if genes is None else sorted(genes), multiindex)
+    return os.path.join(_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.parquet')
+
+
+def _write_gct_cache(df, cache_path):
+    """
+    Write the Dataframe to the Parquet cache, writing to a temporary file first
+    so that a partially written file is never loaded
+    """
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        df.to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_gct_parallel(path, data_start, column_names, column_types, engine, usecols, index_col, n_jobs):
+    """
+    Parse the GCT data lines of a local file using a pool of n_jobs processes,
+    each reading a byte range which begins and ends on a line boundary
+    """
+    # Divide the data lines into roughly equal byte ranges, moving each boundary to the start of the next line
+    size = os.path.getsize(path)
+    boundaries = [data_start]
+    with open(path, 'rb') as f:
+        for i in range(1, n_jobs):
+            f.seek(max(data_start + (size - data_start) * i // n_jobs - 1, boundaries[-1]))
+            f.readline()
+            boundaries.append(f.tell())
+    boundaries.append(size)
+    ranges = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+    # Parse each range in its own process and combine the results in file order
+    if not ranges:
+        return _parse_gct_range(path, data_start, data_start, column_names, column_types, engine, usecols, index_col)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(_parse_gct_range, path, start, end, column_names, column_types, engine,
+                                   usecols, index_col) for start, end in ranges]
+        return pd.concat([future.result() for future in futures])
+
+
+def _parse_gct_range(path, start, end, column_names, column_types, engine, usecols, index_col):
+    """
+    Parse the GCT data lines found between the start and end byte offsets of a local file.
+    Defined at module level so that it can be called in a worker process.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = io.BytesIO(f.read(end - start))
+    return pd.read_csv(data, sep='\t', engine=engine, header=None, names=column_names, index_col=index_col,
+                       usecols=usecols, dtype=column_types, skip_blank_lines=True)
+
+
+#########################
+# ODF Utility Functions #
+#########################
 
-    # Add the initial ODF version line
-    combined = 'ODF 1.0\n'
 
-    # Add HeaderLines
-    combined += 'HeaderLines=' + str(len(headers)) + '\n'
+def _header_dict_to_str(headers):
+    # Add the initial ODF version line and HeaderLines
+    parts = ['ODF 1.0\n', 'HeaderLines=' + str(len(headers)) + '\n']
 
     # Add column names, if available
     if 'COLUMN_NAMES' in headers:
-        combined += 'COLUMN_NAMES:' + str(headers['COLUMN_NAMES']) + '\n'
+        parts.append('COLUMN_NAMES:' + str(headers['COLUMN_NAMES']) + '\n')
 
     # Add column types, if available
     if 'COLUMN_TYPES' in headers:
-        combined += 'COLUMN_TYPES:' + str(headers['COLUMN_TYPES']) + '\n'
+        parts.append('COLUMN_TYPES:' + str(headers['COLUMN_TYPES']) + '\n')
 
     # Add model, if available
     if 'Model' in headers:
-        combined += 'Model=' + str(headers['Model']) + '\n'
+        parts.append('Model=' + str(headers['Model']) + '\n')
 
-    # Add remaining headers
-    for key, value in sorted(headers.items()):
-        if key not in special:
-            combined += str(key) + '=' + str(value) + '\n'
+    # Add remaining headers, sorting only those that aren't handled as special cases
+    for key in sorted(key for key in headers if key not in _ODF_SPECIAL_HEADERS):
+        parts.append(str(key) + '=' + str(headers[key]) + '\n')
 
     # Add data lines, if available
     if 'DataLines' in headers:
-        combined += 'DataLines=' + str(headers['DataLines']) + '\n'
+        parts.append('DataLines=' + str(headers['DataLines']) + '\n')
 
     # Return the combined header string
-    return combined
+    return ''.join(parts)
 
 
-def _apply_odf_properties(df, headers, model):
+def _odf_frame(df, headers, model):
     """
-    Attach properties to the Dataframe to carry along ODF metadata
+    Return the parsed ODF file as a GPDataFrame carrying along the ODF metadata
 
-    :param df: The dataframe to be modified
+    :param df: The parsed dataframe
     :param headers: The ODF header lines
     :param model: The ODF model type
     """
+    df = GPDataFrame(df)
     df.headers = headers
     df.model = model
+    return df
+
+
+def _read_odf_body(odf_io, column_names, engine):
+    """
+    Parse the ODF data lines into a DataFrame. Rows often end in a trailing tab, which
+    would otherwise make pandas use the first column as the index; pyarrow doesn't accept
+    index_col=False, so the empty columns it reads past the declared ones are dropped instead.
+    """
+    engine = _pandas_engine(engine)
+    if engine != 'pyarrow':
+        return pd.read_csv(odf_io, sep='\t', engine=engine, header=None, names=column_names, index_col=False,
+                           skip_blank_lines=True)
+
+    df = pd.read_csv(odf_io, sep='\t', engine=engine, header=None, skip_blank_lines=True)
+    if column_names is not None:
+        df = df.iloc[:, :len(column_names)].reindex(columns=range(len(column_names)))
+        df.columns = column_names
+    return df
 
 
 def _bytes_to_str(lines):
@@ -293,33 +856,46 @@ def _bytes_to_str(lines):
     Convert all lines from byte string to unicode string, if necessary
     """
     if len(lines) >= 1 and hasattr(lines[0], 'decode'):
-        return [line.decode('utf-8') for line in lines]
+        # Decode all the lines in one call, then split them again on the same '\n' line endings
+        text_lines = io.StringIO(b''.join(lines).decode('utf-8'), newline='\n').readlines()
+
+        # Empty lines read at the end of the file disappear in the join, so restore them
+        return text_lines + [''] * (len(lines) - len(text_lines))
     else:
         return lines
 
 
+def _read_text_lines(io_obj):
+    """
+    Read all lines from the IO object as unicode strings, decoding UTF-8
+    through a TextIOWrapper if the object returns bytes
+    """
+    if isinstance(io_obj.read(0), str):
+        return io_obj.readlines()
+    if not isinstance(io_obj, io.IOBase):
+        io_obj = io.BytesIO(io_obj.read())
+
+    # Split on '\n' alone like binary readlines(), and detach so that the caller's stream isn't closed
+    text_io = io.TextIOWrapper(io_obj, encoding='utf-8', newline='\n')
+    try:
+        return text_io.readlines()
+    finally:
+        text_io.detach()
+
+
 def _extract_header_value(line):
     """
-    Extracts a key / value pair from a header line in an ODF file
+    Extracts a (key, value) tuple from a header line in an ODF file
     """
 
     # Skip blank lines, returning None
-    if not line:
+    if not line.strip():
         return None
 
-    # Attempt to split by equals sign
-    halves = line.split('=')
-    if len(halves) > 1:
-        key = halves[0].strip()
-        value = halves[1].strip()
-        return {key: value}
-
-    # Otherwise, attempt to split by colon
-    else:
-        halves = line.split(':')
-        key = halves[0].strip()
-        value = halves[1].strip()
-        return {key: value}
+    match = _ODF_HEADER_RE.match(line)
+    if match is None:
+        raise ValueError('Malformed ODF header line: {}'.format(line))
+    return match.groups()
 
 
 def _extract_column_names(headers):
@@ -344,44 +920,28 @@ def _extract_header_number(lines):
     """
     Extracts the number of header lines from the second line of the ODF file
     """
-    pair = _extract_header_value(lines[1])
-    value_list = list(pair.values())
-    return int(value_list[0])
+    return int(_extract_header_value(lines[1])[1])
 
 
-def _parse_header(lines):
+def _parse_header(odf_io):
     """
-    Parse the ODF header and return a dict of all key / value pairs
+    Read the ODF header from the IO object and return a dict of all key / value pairs,
+    along with the number of lines read. Only the header lines are read, leaving the IO
+    object positioned at the first data line.
     """
-    header_count = _extract_header_number(lines)
-    header_dict = {}
-    for i in range(2, header_count + 2):
-        pair = _extract_header_value(lines[i])
-
-        if not pair:  # Ignore empty strings
+    header_count = _extract_header_number(_bytes_to_str([odf_io.readline() for _ in range(2)]))
+    line_count = 2
+    pairs = []
+    while header_count > 0:
+        line = odf_io.readline()
+        if not line:  # Stop at the end of the file
+            break
+        line_count += 1
+        pair = _extract_header_value((line.decode('utf-8') if isinstance(line, bytes) else line).strip())
+
+        if not pair:  # Ignore blank lines, which don't count towards HeaderLines
             continue
 
-        header_dict.update(pair)
-    return header_dict
-
-
-def count_header_blanks(lines, count):
-    """
-    Count the number of blank lines in the header
-    """
-    blanks = 0
-    for i in range(2, count + 2):
-        pair = _extract_header_value(lines[i])
-        if not pair:
-            blanks += 1
-    return blanks
-
-
-def _join_data_lines(lines, skip):
-    """
-    Join all the data lines into a byte string
-    """
-    lines = list(map(str.strip, lines))
-    blank_lines = count_header_blanks(lines, skip)
-    body = lines[skip + blank_lines + 2:]
-    return '\n'.join(body)
+        pairs.append(pair)
+        header_count -= 1
+    return dict(pairs), line_count
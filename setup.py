@@ -1,8 +1,10 @@
+import re
 from setuptools import setup
 
 
 # Read version and other metadata from file
-__version__ = '24.01'
+with open('gp/__init__.py') as f:
+    __version__ = re.search(r"^__version__ = '([^']+)'", f.read(), re.MULTILINE).group(1)
 
 with open('README.md') as f:
     long_description = f.read()
@@ -10,6 +12,7 @@ with open('README.md') as f:
 setup(
     name='genepattern-python',
     packages=['gp'],
+    package_data={'gp': ['*.pyi']},
     version=__version__,
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,318 @@
+"""
+Tests for the GenePattern REST client, run against a local mock GenePattern server
+"""
+import json
+import enum
+import uuid
+import datetime
+import time
+import threading
+import socketserver
+import urllib.error
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import gp
+
+
+class MockGenePattern(BaseHTTPRequestHandler):
+    """
+    Answers the subset of the GenePattern REST API used by gp.core. Each test
+    configures the behavior and inspects the received requests through state.
+    """
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=b'', headers=()):
+        if status == 304:
+            self.state['not_modified'] += 1
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        state = self.state
+        state['requests'].append((method, self.path, body))
+        path = self.path.split('?')[0]
+
+        if method == 'POST' and path == '/gp/rest/v1/jobs':
+            state['job_posts'] += 1
+            if state['job_posts'] <= state['drop_job_posts']:
+                # Accept the job, then drop the connection without answering
+                self.close_connection = True
+                return
+            return self.reply(201, {'jobId': 5})
+        if path.endswith('/status.json'):
+            state['polls'] += 1
+            finished = state['polls'] >= state['finish_after']
+            return self.reply(200, {'isFinished': finished, 'hasError': False, 'isPending': False,
+                                    'statusMessage': 'Completed' if finished else 'Processing'})
+        if path == '/gp/rest/v1/jobs/':
+            # The job listing holds summary info, without the input parameters
+            summary = job_info(5, True)
+            del summary['inputParams']
+            return self.reply(200, {'items': [summary]})
+        if path.startswith('/gp/rest/v1/jobs/'):
+            state['polls'] += 1
+            return self.reply(200, job_info(int(path.split('/')[5]), state['polls'] >= state['finish_after']))
+        if path == '/gp/rest/v1/tasks/all.json':
+            state['task_list_fetches'] += 1
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self.reply(304)
+            return self.reply(200, {'all_modules': [{'lsid': 'urn:lsid:test:1', 'name': 'Test'}]}, [('ETag', '"v1"')])
+        if path.startswith('/gp/rest/v1/tasks/'):
+            state['task_fetches'] += 1
+            return self.reply(200, TASK, [('ETag', '"t1"')])
+        if path == '/gp/rest/v1/oauth2/token':
+            state['logins'] += 1
+            return self.reply(200, {'access_token': 'token%d' % state['logins']})
+        if path == '/gp/jobResults/5/a.txt':
+            # Only the most recent token is accepted
+            if self.headers.get('Authorization') != 'Bearer token%d' % state['logins']:
+                return self.reply(401, b'Unauthorized')
+            return self.reply(200, b'Contents')
+        if path == '/gp/rest/v1/config/system-message':
+            state['message_fetches'] += 1
+            if state['message_fetches'] <= state['drop_messages']:
+                self.close_connection = True
+                return
+            # Close the connection after answering, without telling the client with a Connection header
+            self.close_connection = state['close_idle']
+            if self.headers.get('If-None-Match') == '"m1"':
+                return self.reply(304)
+            return self.reply(200, b'Welcome', [('ETag', '"m1"')])
+        return self.reply(404, b'Not found')
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+
+class MockServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+TASK = {'name': 'Test', 'lsid': 'urn:lsid:test:1', 'version': '1', 'description': 'A test module',
+        'params': [{'input': {'description': 'Input file', 'attributes': {'optional': '', 'TYPE': 'FILE'}}}]}
+
+
+def job_info(job_id, finished):
+    return {'taskName': 'Test', 'taskLsid': 'urn:lsid:test:1', 'userId': 'test', 'jobId': str(job_id),
+            'status': {'isFinished': finished, 'hasError': False, 'isPending': False,
+                       'statusMessage': 'Completed' if finished else 'Processing'},
+            'dateSubmitted': '2024-01-01', 'logFiles': [], 'outputFiles': [], 'numOutputFiles': 0,
+            'inputParams': [{'input': 'a.gct'}]}
+
+
+def wait_until_closed(server, timeout=5):
+    """
+    Wait for the server to finish closing the idle connections, which it does just after answering
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        idle = [connection for connections in server._pool._idle.values() for connection in connections]
+        if all(gp.core._is_dropped(connection) for connection in idle):
+            return
+        time.sleep(0.01)
+
+
+@pytest.fixture(scope='module')
+def mock_url():
+    httpd = MockServer(('localhost', 0), MockGenePattern)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://localhost:%d/gp' % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def state():
+    MockGenePattern.state = {'requests': [], 'job_posts': 0, 'drop_job_posts': 0, 'polls': 0, 'finish_after': 1,
+                             'task_list_fetches': 0, 'task_fetches': 0, 'message_fetches': 0,
+                             'drop_messages': 0, 'close_idle': False, 'not_modified': 0,
+                             'logins': 0}
+    return MockGenePattern.state
+
+
+@pytest.fixture
+def server(mock_url, state):
+    return gp.GPServer(mock_url, 'test', 'test')
+
+
+def test_invalidate_task_cache(server, state):
+    tasks = server.get_task_list()
+    tasks[0].param_load()
+    assert server.get_task_list()[0].get_name() == 'Test'
+    assert state['task_list_fetches'] == 1
+
+    server.invalidate_task_cache()
+    tasks = server.get_task_list()
+    tasks[0].param_load()
+    assert state['task_list_fetches'] == 2
+    assert state['task_fetches'] == 2
+    assert state['not_modified'] == 1  # The task list is revalidated with its ETag
+
+
+def test_system_message_revalidated(server, state):
+    assert server.system_message() == 'Welcome'
+    assert server.system_message() == 'Welcome'
+    assert state['message_fetches'] == 2
+    assert state['not_modified'] == 1
+
+
+def test_wait_until_done(server, state, monkeypatch):
+    monkeypatch.setattr(gp.core, '_POLL_MIN', 0.01)
+    monkeypatch.setattr(gp.core, '_POLL_MAX', 0.01)
+    state['finish_after'] = 4
+    job = server.run_job(gp.GPJobSpec(server, 'urn:lsid:test:1'))
+    assert job.is_finished()
+    assert job.status == 'Completed'
+
+    # Only the status is polled while the job runs, and the full job info is fetched again once it finishes
+    paths = [path.split('?')[0] for method, path, body in state['requests'] if method == 'GET']
+    assert paths == ['/gp/rest/v1/jobs/5'] + ['/gp/rest/v1/jobs/5/status.json'] * 3 + ['/gp/rest/v1/jobs/5']
+
+    # A finished job is not queried again
+    job.get_info()
+    assert job.is_finished()
+    assert len(state['requests']) == 6
+
+
+def test_job_info_ttl(server, state, monkeypatch):
+    state['finish_after'] = 10
+    job = gp.GPJob(server, 5)
+    job.get_info()
+    job.get_info()
+    assert state['polls'] == 1
+
+    # Unfinished jobs are queried again once the TTL has passed
+    monkeypatch.setattr(gp.GPJob, 'INFO_TTL', 0)
+    job.get_info()
+    assert state['polls'] == 2
+
+
+def test_connection_reused(server, state):
+    server.get_task_list()
+    server.system_message()
+    server.run_job(gp.GPJobSpec(server, 'urn:lsid:test:1'), wait_until_done=False)
+    assert len(server._pool._idle[('http', server.url.split('/')[2])]) == 1
+
+
+def test_get_retried_on_dropped_connection(server, state):
+    server.get_task_list()  # Open a connection for the next call to reuse
+    state['drop_messages'] = 1
+    assert server.system_message() == 'Welcome'
+    assert state['message_fetches'] == 2
+
+
+def test_post_not_resent_after_dropped_connection(server, state):
+    server.get_task_list()  # Open a connection for the next call to reuse
+    state['drop_job_posts'] = 1
+    with pytest.raises(urllib.error.URLError):
+        server.run_job(gp.GPJobSpec(server, 'urn:lsid:test:1'), wait_until_done=False)
+    assert state['job_posts'] == 1
+
+
+def test_post_uses_new_connection_when_idle_one_closed(server, state):
+    state['close_idle'] = True
+    server.system_message()  # The server closes this connection once it has answered
+    wait_until_closed(server)
+    job = server.run_job(gp.GPJobSpec(server, 'urn:lsid:test:1'), wait_until_done=False)
+    assert job.job_number == 5
+    assert state['job_posts'] == 1
+
+
+def test_json_encoder(server):
+    resource = gp.GPResource('http://localhost/gp/rest/v1/jobs/5')
+    gpfile = gp.GPFile(server, 'http://localhost/gp/jobResults/5/a.gct')
+    assert json.loads(json.dumps([resource, gpfile], cls=gp.GPJSONEncoder)) == \
+        [{'__GPResource__': {'uri': 'http://localhost/gp/rest/v1/jobs/5'}}, 'http://localhost/gp/jobResults/5/a.gct']
+    with pytest.raises(TypeError):
+        json.dumps({'values': {1, 2}}, cls=gp.GPJSONEncoder)
+
+
+class Color(enum.Enum):
+    RED = 'red'
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_json_dumps(server, monkeypatch, use_orjson):
+    if use_orjson:
+        monkeypatch.setattr(gp.core, 'orjson', pytest.importorskip('orjson'))
+    else:
+        monkeypatch.setattr(gp.core, 'orjson', None)
+
+    gpfile = gp.GPFile(server, 'http://localhost/gp/jobResults/5/a.gct')
+    obj = {'lsid': 'urn:lsid:test:1', 3: 'caf\u00e9', 'params': [{'name': 'input', 'values': [gpfile, 1, 2.5, None, True]}],
+           'color': Color.RED, 'id': uuid.UUID(int=1), 'point': Point(1, 2)}
+    assert gp.core._json_dumps(obj) == (
+        b'{"lsid":"urn:lsid:test:1","3":"caf\xc3\xa9","params":[{"name":"input","values":'
+        b'["http://localhost/gp/jobResults/5/a.gct",1,2.5,null,true]}],"color":"red",'
+        b'"id":"00000000-0000-0000-0000-000000000001","point":{"__Point__":{"x":1,"y":2}}}')
+    with pytest.raises(TypeError):
+        gp.core._json_dumps({'date': datetime.date(2020, 1, 1)})
+
+
+def test_get_info_replaces_listed_info(server, state):
+    job = server.get_recent_jobs()[0]
+    assert job.is_finished()
+    job.get_info()
+    assert job.get_input_params() == {'input': 'a.gct'}
+    assert state['polls'] == 1
+
+    # The full info of a finished job is reused
+    job.get_info()
+    assert state['polls'] == 1
+
+
+def test_listed_job_info(server, state):
+    job = server.get_recent_jobs()[0]
+
+    # The listed status is reused, the rest of the info is fetched in full when needed
+    assert job.is_finished()
+    assert state['polls'] == 0
+    assert job.get_input_params() == {'input': 'a.gct'}
+    assert state['polls'] == 1
+
+
+def test_file_download_after_token_expires(server, state, mock_url):
+    server.login()
+    gpfile = gp.GPFile(server, mock_url + '/jobResults/5/a.txt')
+    assert gpfile.read() == 'Contents'
+
+    # Another login elsewhere replaces the token, so this one is rejected and the download logs in again
+    state['logins'] += 1
+    assert gpfile.read() == 'Contents'
+    assert server.token == 'token3'
+
+
+def test_json_encode_job(server, state):
+    server.system_message()  # Fill the connection pool and ETag cache
+    encoded = json.loads(json.dumps(gp.GPJob(server, 1), cls=gp.GPJSONEncoder))
+    assert encoded['__GPJob__']['uri'] == '1'
+    assert encoded['__GPJob__']['server_data'] == {'__GPServer__': {
+        'url': server.url, 'username': 'test', 'password': 'test', 'token': None, 'last_job': None}}
+    assert json.loads(gp.core._json_dumps(gp.GPJob(server, 1).server_data)) == encoded['__GPJob__']['server_data']
@@ -49,6 +49,24 @@ def test_gct_load_string():
     gct_asserts(gct)
 
 
+def test_gct_iter_chunks():
+    chunks = list(gp.data.iter_gct('all_aml_test.gct', chunksize=1000))
+    gct = gp.data.GCT('all_aml_test.gct')
+    assert len(chunks) > 1
+    assert sum(len(chunk.index) for chunk in chunks) == gct.row_count()
+    assert all(len(chunk.columns) == gct.col_count() for chunk in chunks)
+
+
+def test_gct_load_subset():
+    full = gp.data.GCT('all_aml_test.gct')
+    samples = list(full.columns[:3])
+    genes = list(full.index.get_level_values(0)[:5])
+    gct = gp.data.GCT('all_aml_test.gct', samples=samples, genes=genes)
+    assert list(gct.columns) == samples
+    assert gct.row_count() == 5
+    assert gct.col_count() == 3
+
+
 def test_odf_load_gpfile():
     gpfile = gp.GPFile(gp.GPServer('http://genepattern.broadinstitute.org/gp', '', ''),
                        'https://datasets.genepattern.org/data/all_aml/all_aml_test.preprocessed.comp.marker.odf')
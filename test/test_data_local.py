@@ -0,0 +1,285 @@
+"""
+Tests for loading GCT, ODF and CLS files from local fixtures, without network access
+"""
+import io
+import bz2
+import math
+import hashlib
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import gp.data
+
+pd = pytest.importorskip('pandas')
+
+
+GCT_TEXT = ('#1.2\n'
+            '3\t2\n'
+            'Name\tDescription\tS1\tS2\n'
+            '00001\tna\t1.5\tNA\n'
+            '00002\tdesc\t2\t3\n'
+            '0003\t\t\t4.25\n')
+
+
+class MockFiles(BaseHTTPRequestHandler):
+    """
+    Serves the files in files, answering If-None-Match with 304 when the ETag matches.
+    Files listed in unsized are sent without a Content-Length.
+    """
+    files = {}
+    unsized = set()
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.files[self.path]
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        self.requests.append((self.path, self.headers.get('If-None-Match') == etag))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        if self.path not in self.unsized:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module')
+def mock_url():
+    httpd = MockServer(('localhost', 0), MockFiles)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://localhost:%d' % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def files(mock_url):
+    MockFiles.files = {'/test.gct': GCT_TEXT.encode('utf-8')}
+    MockFiles.unsized = set()
+    MockFiles.requests = []
+    yield MockFiles
+    gp.data.set_url_cache_size(0)
+    gp.data.clear_cache()
+
+
+@pytest.fixture
+def gct_path(tmp_path):
+    path = tmp_path / 'test.gct'
+    path.write_text(GCT_TEXT)
+    return str(path)
+
+
+def gct_rows(df):
+    """
+    Return the rows of a GCT Dataframe as plain tuples, with every missing value as None
+    """
+    def value(v):
+        return None if v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v)) else v
+    return [tuple(value(v) for v in (index if isinstance(index, tuple) else (index,))) +
+            tuple(value(float(v)) for v in row) for index, row in zip(df.index, df.values)]
+
+
+@pytest.mark.parametrize('engine', ['c', 'python', 'pyarrow', 'polars'])
+def test_gct_engine_parity(gct_path, engine):
+    if engine in ('pyarrow', 'polars'):
+        pytest.importorskip(engine)
+    expected = [('00001', 'na', 1.5, None), ('00002', 'desc', 2.0, 3.0), ('0003', None, None, 4.25)]
+    assert gct_rows(gp.data.GCT(gct_path, engine=engine)) == expected
+    assert gct_rows(gp.data.GCT(GCT_TEXT, engine=engine)) == expected
+    assert gct_rows(gp.data.GCT(GCT_TEXT, engine=engine, samples=['S2'])) == [row[:2] + row[3:] for row in expected]
+
+
+@pytest.mark.parametrize('engine', ['c', 'python', 'pyarrow', 'polars'])
+def test_gct_engine_parity_empty(tmp_path, engine):
+    if engine in ('pyarrow', 'polars'):
+        pytest.importorskip(engine)
+    text = '#1.2\n0\t2\nName\tDescription\tS1\tS2\n'
+    path = tmp_path / 'empty.gct'
+    path.write_text(text)
+    for gct_obj in (str(path), text, io.StringIO(text)):
+        df = gp.data.GCT(gct_obj, engine=engine)
+        assert df.row_count() == 0
+        assert list(df.columns) == ['S1', 'S2']
+        assert list(df.index.names) == ['Name', 'Description']
+
+
+def test_url_cache_disabled_by_default(mock_url, files):
+    gp.data.GCT(mock_url + '/test.gct')
+    gp.data.GCT(mock_url + '/test.gct')
+    assert files.requests == [('/test.gct', False), ('/test.gct', False)]
+    assert not gp.data._url_cache
+
+
+def test_url_cache_revalidates(mock_url, files):
+    gp.data.set_url_cache_size()
+    first = gp.data.GCT(mock_url + '/test.gct')
+    second = gp.data.GCT(mock_url + '/test.gct')
+    assert files.requests == [('/test.gct', False), ('/test.gct', True)]
+    assert gct_rows(first) == gct_rows(second)
+
+    # A changed file is downloaded again
+    files.files['/test.gct'] = GCT_TEXT.replace('1.5', '2.5').encode('utf-8')
+    assert gp.data.GCT(mock_url + '/test.gct').values[0][0] == 2.5
+    assert files.requests[-1] == ('/test.gct', False)
+
+
+def test_url_cache_size_limit(mock_url, files):
+    body = GCT_TEXT.encode('utf-8')
+    files.files.update({'/a.gct': body, '/b.gct': body, '/c.gct': body})
+    files.unsized.add('/c.gct')
+    gp.data.set_url_cache_size(2 * len(body))
+    for name in ('/test.gct', '/a.gct', '/b.gct', '/c.gct'):
+        gp.data.GCT(mock_url + name)
+
+    # The least recently used file is evicted, and a file of unknown size is streamed rather than kept
+    assert list(gp.data._url_cache) == [mock_url + '/a.gct', mock_url + '/b.gct']
+
+    # Files larger than the whole cache are never kept
+    gp.data.set_url_cache_size(len(body) - 1)
+    assert not gp.data._url_cache
+    gp.data.GCT(mock_url + '/a.gct')
+    assert not gp.data._url_cache
+
+
+def test_gct_cache_per_engine(gct_path, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(gp.data, '_CACHE_DIR', str(cache_dir))
+    parsed = {engine: gp.data.GCT(gct_path, engine=engine, cache=True) for engine in ('c', 'pyarrow')}
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # Loading again reads each engine's own copy
+    for engine, df in parsed.items():
+        cached = gp.data.GCT(gct_path, engine=engine, cache=True)
+        assert gct_rows(cached) == gct_rows(df)
+        assert list(cached.dtypes) == list(df.dtypes)
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_gct_dimensions_not_checked():
+    # The declared dimensions are not used, so a malformed dimensions line does not prevent loading
+    text = GCT_TEXT.replace('3\t2\n', '3 rows\n')
+    assert gct_rows(gp.data.GCT(text)) == gct_rows(gp.data.GCT(GCT_TEXT))
+    assert sum(len(chunk) for chunk in gp.data.iter_gct(text, chunksize=2)) == 3
+
+
+ODF_TEXT = ('ODF 1.0\n'
+            'HeaderLines=4\n'
+            'Model=Dataset\n'
+            'COLUMN_NAMES:Name\tValue\n'
+            'COLUMN_TYPES:String\tfloat\n'
+            'DataLines=2\n'
+            'a\t1.5\n'
+            'b\t2\n')
+
+
+def test_odf_load():
+    odf = gp.data.ODF(ODF_TEXT)
+    assert odf.model == 'Dataset'
+    assert odf.headers['DataLines'] == '2'
+    assert odf.values.tolist() == [['a', 1.5], ['b', 2.0]]
+
+
+def test_odf_malformed_header():
+    with pytest.raises(TypeError):
+        gp.data.ODF(ODF_TEXT.replace('DataLines=2', 'DataLines 2'))
+
+
+def test_odf_load_binary_and_text():
+    assert gp.data.ODF(io.BytesIO(ODF_TEXT.encode('utf-8'))).headers == gp.data.ODF(io.StringIO(ODF_TEXT)).headers
+
+
+@pytest.mark.parametrize('n_jobs', [2, 3, 20])
+def test_gct_n_jobs(tmp_path, n_jobs):
+    lines = ['{:05d}\tdesc {}\t{}\t{}'.format(i, i, i * 0.5, 'NA' if i % 3 else i) for i in range(10)]
+    path = tmp_path / 'big.gct'
+    path.write_text('#1.2\n10\t2\nName\tDescription\tS1\tS2\n' + '\n'.join(lines) + '\n')
+    expected = gct_rows(gp.data.GCT(str(path)))
+    assert len(expected) == 10
+    assert gct_rows(gp.data.GCT(str(path), n_jobs=n_jobs)) == expected
+    subset = gp.data.GCT(str(path), n_jobs=n_jobs, samples=['S2'], multiindex=False)
+    assert list(subset.columns) == ['Description', 'S2']
+    assert gct_rows(subset[['S2']]) == [(row[0], row[3]) for row in expected]
+
+
+def test_gct_cache_invalidated(gct_path, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(gp.data, '_CACHE_DIR', str(tmp_path / 'cache'))
+    assert gct_rows(gp.data.GCT(gct_path, cache=True))[0][2] == 1.5
+    assert gct_rows(gp.data.GCT(gct_path, cache=True))[0][2] == 1.5
+
+    # A modified file is parsed again rather than loaded from the cache
+    with open(gct_path, 'w') as f:
+        f.write(GCT_TEXT.replace('1.5', '2.5'))
+    assert gct_rows(gp.data.GCT(gct_path, cache=True))[0][2] == 2.5
+
+
+CLS_TEXT = '4 2 1\n# ALL AML\n0 0 1 1\n'
+
+
+def test_cls_load(tmp_path):
+    path = tmp_path / 'test.cls.bz2'
+    path.write_bytes(bz2.compress(CLS_TEXT.encode('utf-8')))
+    for cls_obj in (CLS_TEXT, str(path), io.BytesIO(CLS_TEXT.encode('utf-8'))):
+        cls = gp.data.CLS(cls_obj)
+        assert (cls.num_samples, cls.num_classes) == (4, 2)
+        assert cls.class_names == ['ALL', 'AML']
+        assert cls.class_assignments == ['0', '0', '1', '1']
+
+
+def test_cls_mismatched_samples():
+    with pytest.raises(ValueError):
+        gp.data.CLS(CLS_TEXT.replace('4 2 1', '5 2 1'))
+
+
+def test_load_many(gct_path, mock_url, files):
+    frames = gp.data.load_many([gct_path, GCT_TEXT, mock_url + '/test.gct'], engine='python')
+    assert [gct_rows(df) for df in frames] == [gct_rows(gp.data.GCT(GCT_TEXT))] * 3
+    assert gp.data.load_many([ODF_TEXT], kind='odf')[0].model == 'Dataset'
+    assert gp.data.load_many([]) == []
+    with pytest.raises(ValueError):
+        gp.data.load_many([gct_path], kind='res')
+
+
+# Exporters often end each data row with a tab
+ODF_TRAILING_TABS = ('ODF 1.0\n'
+                     'HeaderLines=3\n'
+                     'Model=Dataset\n'
+                     'COLUMN_NAMES:Name\tV\tW\n'
+                     'DataLines=2\n'
+                     'a\t1.5\t2\t\n'
+                     'b\t2.0\t3\t\n')
+
+
+@pytest.mark.parametrize('engine', ['c', 'python', 'pyarrow'])
+def test_odf_trailing_tabs(tmp_path, engine):
+    if engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    path = tmp_path / 'test.odf'
+    path.write_text(ODF_TRAILING_TABS)
+    for odf_obj in (str(path), ODF_TRAILING_TABS, io.StringIO(ODF_TRAILING_TABS),
+                    io.BytesIO(ODF_TRAILING_TABS.encode('utf-8'))):
+        odf = gp.data.ODF(odf_obj, engine=engine)
+        assert list(odf.columns) == ['Name', 'V', 'W']
+        assert odf.values.tolist() == [['a', 1.5, 2], ['b', 2.0, 3]]
+
+
+def test_gct_cache_missing_file(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(gp.data, '_CACHE_DIR', str(tmp_path / 'cache'))
+    with pytest.raises(IOError, match='Input string not determined'):
+        gp.data.GCT(str(tmp_path / 'missing.gct'), cache=True)